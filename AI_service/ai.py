@@ -1,76 +1,270 @@
-from fastapi import FastAPI, HTTPException, Depends, status, File, UploadFile,  Form
+from fastapi import FastAPI, HTTPException, Depends, status, File, UploadFile,  Form, Header, Query
 from fastapi.responses import StreamingResponse, HTMLResponse, JSONResponse
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 from typing import Annotated
 from pathlib import Path
 from fastapi.staticfiles import StaticFiles
-import os, shutil
-from embed_data import embed_data
+import os, shutil, json, hmac
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from embed_data import embed_data, sync_data, load_embed_model, open_disk_cache, DEFAULT_BATCH_SIZE
+from build_index import resolve_index_dir, read_manifest, COLLECTION_NAME
 import pandas as pd
-from sentence_transformers import SentenceTransformer
-from transformers import AutoTokenizer, AutoModelForCausalLM
 import chromadb
 import uvicorn
-from dept import disease_detection , dept_generate, dept_finalize
+from dept import disease_detection_batch, dedupe_diseases, resolve_departments, iter_departments, vote_stats
+from dept_cache import DepartmentCache, DEFAULT_CACHE_PATH, DEFAULT_TTL
+from build_dept_table import load_dept_table, DEFAULT_TABLE_PATH
+from department_mapping import extend_department_map
+from batcher import MicroBatcher
+from query_cache import EmbeddingCache
+from vector_store import NumpyVectorStore
+from ivfpq import IvfPqIndex, build_ivfpq, DEFAULT_NPROBE, DEFAULT_RERANK
+from centroid_index import CentroidIndex, build_centroid_index, DEFAULT_SHORTLIST
+import sharded_store
+from lexical_index import LexicalIndex, load_vocabulary, rows_from_collection, rrf_fuse, canonical_phrase
+from symptom_matrix import SymptomMatrix, build_symptom_matrix, load_symptoms, DEFAULT_MATRIX_PATH, DEFAULT_JSON as SYMPTOM_JSON
+from symptom_normalizer import SymptomNormalizer
+from corpus_dedup import dedupe_corpus
+from symptom_autocomplete import SymptomAutocomplete, normalize_prefix, DEFAULT_LIMIT as AUTOCOMPLETE_LIMIT, MAX_SUGGESTIONS
 from typing import List
 from fastapi import Body
 
 model_embed =None
 collection=None
 client=None
-disease_list={}
-dept_list=[]
+
+# "build" embeds dataset/data_textual.csv into ./chroma_db on first boot,
+# "prebuilt" only opens a snapshot produced by build_index.py
+INDEX_MODE = os.getenv("INDEX_MODE", "build")
+INDEX_ROOT = os.getenv("INDEX_ROOT", "indexes")
+# Corpus dedup before embedding in build mode: "off", "exact" or "subset" (see corpus_dedup.py)
+CORPUS_DEDUP = os.getenv("CORPUS_DEDUP", "exact")
+# On-disk embedding cache used by build-mode ingestion ("" disables, see embedding_disk_cache.py)
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "embedding_cache")
+# In build mode, incrementally sync a non-empty ./chroma_db with the CSV on startup
+INDEX_SYNC = os.getenv("INDEX_SYNC", "1") == "1"
+# Search backend behind disease_detection: "chroma", "numpy" (mmap exact search, see vector_store.py)
+# "ivfpq" (compressed approximate search with exact re-ranking, see ivfpq.py)
+# "centroid" (per-disease centroids, k distinct diseases per query, see centroid_index.py)
+# or "sharded" (exact search scattered over worker processes, see sharded_store.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", str(DEFAULT_NPROBE)))
+IVF_RERANK = int(os.getenv("IVF_RERANK", str(DEFAULT_RERANK)))
+CENTROID_SHORTLIST = int(os.getenv("CENTROID_SHORTLIST", str(DEFAULT_SHORTLIST)))
+# Lexical BM25 retrieval: "off", "auto" (exact-vocabulary queries skip the model)
+# or "hybrid" (auto, plus reciprocal-rank fusion with vector results for other queries)
+LEXICAL_MODE = os.getenv("LEXICAL_MODE", "auto")
+# Shard count used when build mode splits the store; prebuilt indexes keep their build-time count
+VECTOR_SHARDS = int(os.getenv("VECTOR_SHARDS", str(os.cpu_count() or 1)))
+# Where build mode keeps non-Chroma stores exported from ./chroma_db
+VECTOR_STORE_ROOT = os.getenv("VECTOR_STORE_ROOT", "vector_store")
+
+embedding_cache = EmbeddingCache(
+    max_size=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "3600")),
+)
+
+dept_cache = DepartmentCache(
+    path=os.getenv("DEPT_CACHE_PATH", DEFAULT_CACHE_PATH),
+    ttl=float(os.getenv("DEPT_CACHE_TTL", str(DEFAULT_TTL))),
+)
+
+# Token required (X-Admin-Token header) by admin endpoints; unset disables them, use the CLIs instead
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+DEPT_CONCURRENCY = int(os.getenv("DEPT_CONCURRENCY", "16"))
+# "batch" classifies all diseases with one structured prompt (voting only for leftovers), "vote" votes per disease
+DEPT_MODE = os.getenv("DEPT_MODE", "batch")
+DEPT_TABLE_PATH = os.getenv("DEPT_TABLE_PATH", DEFAULT_TABLE_PATH)
+# Rewrite Bengali/mixed queries into canonical English symptoms before retrieval (see symptom_normalizer.py)
+SYMPTOM_NORMALIZE = os.getenv("SYMPTOM_NORMALIZE", "1") == "1"
+SYMPTOMS_CSV = os.getenv("SYMPTOMS_CSV", "dataset/symptoms.csv")
+# Packed disease x symptom matrix behind /detect_disease/structured (see symptom_matrix.py)
+SYMPTOM_MATRIX_PATH = os.getenv("SYMPTOM_MATRIX_PATH", DEFAULT_MATRIX_PATH)
+
+# Model inference and vector search run on this bounded pool so the event loop only does I/O
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+
+# Concurrent /detect_disease calls arriving within BATCH_WINDOW_MS share one encode and one collection.query
+detection_batcher = MicroBatcher(
+    lambda queries: disease_detection_batch(model_embed, collection, queries, cache=embedding_cache),
+    window_ms=float(os.getenv("BATCH_WINDOW_MS", "5")),
+    max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "32")),
+    executor=inference_executor,
+    max_in_flight=INFERENCE_WORKERS,
+)
+lexical_index = None
+LEXICAL_STATS = Counter()
+symptom_matrix = None
+symptom_normalizer = None
+symptom_autocomplete = None
+
+
+def open_vector_backend(store_root, chroma_collection=None, changed=False):
+    """
+    Open the VECTOR_BACKEND store under store_root. With chroma_collection
+    the store is (re)exported from it first when missing, when its row count
+    differs, or when ingestion just changed the collection.
+    """
+    if VECTOR_BACKEND not in ("numpy", "ivfpq", "centroid", "sharded"):
+        raise ValueError(f"Unknown VECTOR_BACKEND '{VECTOR_BACKEND}'")
+
+    store_dir = os.path.join(store_root, "numpy")
+    exported = False
+    if chroma_collection is not None and (
+            changed
+            or not NumpyVectorStore.exists(store_dir)
+            or NumpyVectorStore(store_dir).count() != chroma_collection.count()):
+        print(f"[STARTUP] Exporting {chroma_collection.count()} embeddings to {store_dir}", flush=True)
+        NumpyVectorStore.from_collection(chroma_collection, store_dir)
+        exported = True
+    store = NumpyVectorStore(store_dir)
+    print(f"[STARTUP] NumPy vector store opened (mmap). Row count: {store.count()}", flush=True)
+    if VECTOR_BACKEND == "numpy":
+        return store
+
+    if VECTOR_BACKEND == "sharded":
+        shards_dir = os.path.join(store_root, "shards")
+        if chroma_collection is not None and (
+                exported
+                or not sharded_store.exists(shards_dir)
+                or len(sharded_store.shard_dirs(shards_dir)) != min(VECTOR_SHARDS, store.count())):
+            sharded_store.split_store(store, shards_dir, VECTOR_SHARDS)
+        sharded = sharded_store.ShardedVectorStore(shards_dir)
+        print(f"[STARTUP] Sharded store opened: {len(sharded.shards)} shards, {sharded.count()} rows", flush=True)
+        return sharded
+
+    if VECTOR_BACKEND == "centroid":
+        centroid_dir = os.path.join(store_root, "centroid")
+        if chroma_collection is not None and (exported or not CentroidIndex.exists(centroid_dir)):
+            build_centroid_index(store, centroid_dir)
+        index = CentroidIndex(centroid_dir, store, shortlist=CENTROID_SHORTLIST)
+        print(f"[STARTUP] Centroid index opened: {len(index.diseases)} diseases (shortlist={CENTROID_SHORTLIST})", flush=True)
+        return index
+
+    ivf_dir = os.path.join(store_root, "ivfpq")
+    if chroma_collection is not None and (exported or not IvfPqIndex.exists(ivf_dir)):
+        build_ivfpq(store, ivf_dir)
+    index = IvfPqIndex(ivf_dir, store, nprobe=IVF_NPROBE, rerank=IVF_RERANK)
+    print(f"[STARTUP] IVF-PQ index opened (nprobe={IVF_NPROBE}, rerank={IVF_RERANK}): {index.memory_report()}", flush=True)
+    return index
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global model_embed, collection, client
+    global model_embed, collection, client, lexical_index, symptom_matrix, symptom_normalizer, symptom_autocomplete
     try:
         print("[STARTUP] Starting application initialization...", flush=True)
 
-        # Load and sample the dataset (using only randomly 100 rows for faster deployment on Railway)
-        df=pd.read_csv("dataset/data_textual.csv")
-        df = df.sample(n=30, random_state=42)
-        print(f"[STARTUP] CSV loaded. Columns: {df.columns.tolist()}", flush=True)
-        print(f"[STARTUP] CSV shape: {df.shape}", flush=True)
-
-        client = chromadb.PersistentClient(path="./chroma_db")
-        collection = client.get_or_create_collection(name="disease_symptoms")
-        print(f"[STARTUP] ChromaDB initialized. Current collection count: {collection.count()}", flush=True)
-
-        # Define model paths
-        model_dir = "models"
-        embed_model_name = "all-MiniLM-L6-v2"
-        embed_model_path = os.path.join(model_dir, embed_model_name)
-        os.makedirs(model_dir, exist_ok=True)
-
-        if os.path.exists(embed_model_path):
-            print(f"[STARTUP] Loading Sentence Transformer model from local path: {embed_model_path}", flush=True)
-            model_embed = SentenceTransformer(embed_model_path)
+        if INDEX_MODE == "prebuilt":
+            # Open a snapshot produced by build_index.py; nothing is read from the CSV or embedded here
+            index_dir = resolve_index_dir(INDEX_ROOT, os.getenv("INDEX_VERSION") or None)
+            manifest = read_manifest(index_dir)
+            print(f"[STARTUP] Opening prebuilt index {manifest['version']} from {index_dir}", flush=True)
+
+            if VECTOR_BACKEND == "chroma":
+                # Chroma 0.5 has no read-only client: the snapshot is opened writable (SQLite may touch
+                # its files), but nothing is ever added to or deleted from the prebuilt collection
+                client = chromadb.PersistentClient(path=os.path.join(index_dir, "chroma_db"))
+                collection = client.get_collection(name=manifest["collection"])
+                print(f"[STARTUP] ChromaDB snapshot opened. Collection count: {collection.count()}", flush=True)
+            else:
+                # The snapshot ships every backend's files; non-Chroma backends never open SQLite
+                collection = open_vector_backend(index_dir)
+
+            model_embed = load_embed_model(manifest["model"])
         else:
-            print(f"[STARTUP] Downloading and caching Sentence Transformer model to: {embed_model_path}", flush=True)
-            model_embed = SentenceTransformer(embed_model_name)
-            model_embed.save(embed_model_path)
-        print("[STARTUP] Sentence Transformer Model is ready for use.", flush=True)
-
-        # Check if we need to embed data
-        current_count = collection.count()
-        if current_count == 0:
-            print(f"[STARTUP] Collection is empty. Embedding {len(df)} rows into ChromaDB...", flush=True)
-            print(f"[STARTUP] NOTE: This only happens on first deploy. Subsequent deploys will use cached data.", flush=True)
-
-            # Embed in smaller batches to avoid Railway timeouts
-            batch_size = 10
-            for i in range(0, len(df), batch_size):
-                batch_df = df.iloc[i:i+batch_size]
-                embed_data(batch_df, model_embed, collection)
-                print(f"[STARTUP] Embedded batch {i//batch_size + 1}/{(len(df)-1)//batch_size + 1} ({i+len(batch_df)}/{len(df)} rows)", flush=True)
-
-            print(f"[STARTUP] Embedding complete! Collection count: {collection.count()}", flush=True)
+            # Load the dataset. EMBED_SAMPLE_ROWS caps in-process ingestion (default 30 random rows, as on Railway);
+            # 0 embeds the full CSV, which takes far longer than a deploy healthcheck, so build that offline
+            # with build_index.py and run INDEX_MODE=prebuilt instead
+            df=pd.read_csv("dataset/data_textual.csv")
+            sample_rows = int(os.getenv("EMBED_SAMPLE_ROWS", "30"))
+            if 0 < sample_rows < len(df):
+                df = df.sample(n=sample_rows, random_state=42)
+            print(f"[STARTUP] CSV loaded. Columns: {df.columns.tolist()}", flush=True)
+            print(f"[STARTUP] CSV shape: {df.shape}", flush=True)
+            if CORPUS_DEDUP != "off":
+                df, _ = dedupe_corpus(df, drop_subsets=CORPUS_DEDUP == "subset")
+
+            client = chromadb.PersistentClient(path="./chroma_db")
+            collection = client.get_or_create_collection(name=COLLECTION_NAME)
+            print(f"[STARTUP] ChromaDB initialized. Current collection count: {collection.count()}", flush=True)
+
+            model_embed = load_embed_model()
+
+            # Check if we need to embed data
+            current_count = collection.count()
+            collection_changed = current_count == 0
+            if current_count == 0:
+                print(f"[STARTUP] Collection is empty. Embedding {len(df)} rows into ChromaDB...", flush=True)
+                print(f"[STARTUP] NOTE: This only happens on first deploy. Subsequent deploys will use cached data.", flush=True)
+
+                # Bulk ingestion: one encode and one upsert per batch
+                batch_size = int(os.getenv("EMBED_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
+                stats = embed_data(df, model_embed, collection, batch_size=batch_size,
+                                   disk_cache=open_disk_cache(model_embed, EMBED_CACHE_DIR))
+                print(f"[STARTUP] Embedded {stats['rows']} rows at {stats['rows_per_sec']} rows/sec", flush=True)
+
+                print(f"[STARTUP] Embedding complete! Collection count: {collection.count()}", flush=True)
+            elif INDEX_SYNC:
+                # Re-embed only rows whose content hash changed and drop rows removed from the CSV
+                print(f"[STARTUP] Syncing existing embeddings with the dataset. Collection count: {current_count}", flush=True)
+                batch_size = int(os.getenv("EMBED_BATCH_SIZE", str(DEFAULT_BATCH_SIZE)))
+                sync = sync_data(df, model_embed, collection, batch_size=batch_size,
+                                 disk_cache=open_disk_cache(model_embed, EMBED_CACHE_DIR))
+                collection_changed = any(sync[key] for key in ("added", "updated", "deleted"))
+                print(f"[STARTUP] Sync complete! Collection count: {collection.count()}", flush=True)
+            else:
+                print(f"[STARTUP] Using existing embeddings. Collection count: {current_count}", flush=True)
+
+            if VECTOR_BACKEND != "chroma":
+                collection = open_vector_backend(VECTOR_STORE_ROOT, chroma_collection=collection,
+                                                 changed=collection_changed)
+
+        if LEXICAL_MODE != "off":
+            lexical_dir = os.path.join(index_dir, "lexical") if INDEX_MODE == "prebuilt" else None
+            if lexical_dir and LexicalIndex.exists(lexical_dir):
+                lexical_index = LexicalIndex.load(lexical_dir)
+            else:
+                lexical_index = LexicalIndex.from_rows(rows_from_collection(collection), load_vocabulary())
+            print(f"[STARTUP] Lexical index ready ({LEXICAL_MODE}): {len(lexical_index.diseases)} diseases, "
+                  f"{len(lexical_index.idf)} indexed symptom phrases", flush=True)
+
+        if os.path.exists(DEPT_TABLE_PATH):
+            table_version, dept_table = load_dept_table(DEPT_TABLE_PATH)
+            print(f"[STARTUP] Department table {table_version} loaded ({len(dept_table)} diseases). "
+                  f"Static map now covers {extend_department_map(dept_table)} names", flush=True)
         else:
-            print(f"[STARTUP] Using existing embeddings. Collection count: {current_count}", flush=True)
+            print(f"[STARTUP] No department table at {DEPT_TABLE_PATH}. Run build_dept_table.py to precompute one.", flush=True)
+
+        if SYMPTOM_NORMALIZE and os.path.exists(SYMPTOMS_CSV):
+            symptom_normalizer = SymptomNormalizer(SYMPTOMS_CSV)
+            print(f"[STARTUP] Bengali symptom normalizer ready ({len(symptom_normalizer.canonical)} names)", flush=True)
 
+        if os.path.exists(SYMPTOMS_CSV):
+            json_vocabulary = []
+            if os.path.exists(SYMPTOM_JSON):
+                with open(SYMPTOM_JSON, encoding="utf-8") as f:
+                    json_vocabulary = [symptom for symptoms in json.load(f).values() for symptom in symptoms]
+            # Symptoms listed by more diseases are suggested first
+            popularity = Counter(canonical_phrase(normalize_prefix(symptom)) for symptom in json_vocabulary)
+            symptom_autocomplete = SymptomAutocomplete.from_sources(load_symptoms(SYMPTOMS_CSV), json_vocabulary, popularity)
+            print(f"[STARTUP] Autocomplete index ready ({len(symptom_autocomplete.entries)} names)", flush=True)
+
+        if os.path.exists(SYMPTOM_MATRIX_PATH):
+            symptom_matrix = SymptomMatrix(SYMPTOM_MATRIX_PATH)
+        elif os.path.exists(SYMPTOM_JSON):
+            symptom_matrix = build_symptom_matrix(SYMPTOM_JSON, out_path=SYMPTOM_MATRIX_PATH)
+        if symptom_matrix is not None:
+            print(f"[STARTUP] Symptom matrix loaded: {len(symptom_matrix.diseases)} diseases x "
+                  f"{len(symptom_matrix.symptoms)} symptoms", flush=True)
+        else:
+            print(f"[STARTUP] No symptom matrix at {SYMPTOM_MATRIX_PATH}. Run symptom_matrix.py to compile one.", flush=True)
+
+        await detection_batcher.start()
         print("[STARTUP] Application initialization complete! Ready to accept requests.", flush=True)
 
     except Exception as e:
@@ -83,46 +277,166 @@ async def lifespan(app: FastAPI):
 
     # Code here would run on shutdown
     print("[SHUTDOWN] Shutting down application...", flush=True)
+    await detection_batcher.stop()
+    inference_executor.shutdown(wait=True)
+    if isinstance(collection, sharded_store.ShardedVectorStore):
+        collection.close()
+    dept_cache.close()
 
 app = FastAPI(lifespan=lifespan)
 
+# Every endpoint works on request-local data only, so concurrent users (and several
+# uvicorn workers) never see each other's diseases.
+
+async def detect_unique_diseases(query):
+    if symptom_normalizer is not None:
+        normalized, unmatched = symptom_normalizer.normalize(query)
+        # Keep the original text when nothing could be mapped
+        if normalized and normalized != query:
+            print(f"[NORMALIZE] '{query}' -> '{normalized}' (unmatched: {unmatched})", flush=True)
+            query = normalized
+
+    terms = []
+    if lexical_index is not None:
+        terms, exact = lexical_index.tokenize(query)
+        # Every phrase is indexed vocabulary: BM25 answers it without touching the model
+        if exact and all(term in lexical_index.idf for term in terms):
+            LEXICAL_STATS["lexical_only"] += 1
+            return lexical_index.search_terms(terms)
+
+    disease_list = await detection_batcher.submit(query)
+    # Keep each disease once with its highest percentage, sorted by percentage
+    disease_list = dedupe_diseases(disease_list)
+    if LEXICAL_MODE == "hybrid" and terms:
+        LEXICAL_STATS["hybrid"] += 1
+        return rrf_fuse([disease_list, lexical_index.search_terms(terms)])
+    LEXICAL_STATS["vector_only"] += 1
+    return disease_list
+
+
+async def departments_for(disease_list):
+    disease_names = [list(disease_dict.keys())[0] for disease_dict in disease_list]
+    # Department table first; the LLM only sees diseases it does not cover
+    return await resolve_departments(disease_names, cache=dept_cache, mode=DEPT_MODE, concurrency=DEPT_CONCURRENCY)
+
+
 @app.post("/detect_disease")
 async def detect_disease(query: str ="depression"):
-    global disease_list
-    disease_list= disease_detection(model_embed, collection, query)
-    # Create a dictionary to store unique diseases with the highest percentage
-    unique_diseases = {}
-    for disease_dict in disease_list:
-        for disease, percentage in disease_dict.items():
-            if disease not in unique_diseases or percentage > unique_diseases[disease]:
-                unique_diseases[disease] = percentage
-    # Convert back to a list of dictionaries and sort by percentage
-    disease_list = sorted([{disease: percentage} for disease, percentage in unique_diseases.items()], key=lambda d: list(d.values())[0], reverse=True)
-
+    disease_list = await detect_unique_diseases(query)
     print(disease_list)
     return {"diseases": disease_list}
 
-@app.get("/detect_dept")
-async def detect_dept():
-    print("Received disease list for department detection:", disease_list)
-    global dept_list
-    dept_list = [] # Clear the list for a new request
-    for disease_dict in disease_list:
-        disease_name = list(disease_dict.keys())[0]
-        dept_list_1=[]
-        for j in range(3):
-            print(f'Sending {disease_name} for the {j} time')
-            dept_1=dept_generate(disease_name)
-            print(dept_1)
-            dept_list_1.append(dept_1)
-        final_dept=dept_finalize(dept_list_1, disease=disease_name)
-        print(f'Finalized dept for disease {disease_name}: {final_dept}')
-        dept_list.append(final_dept)
-        
+@app.get("/symptoms")
+async def list_symptoms():
+    """Symptom IDs accepted by /detect_disease/structured, with Bengali names where known."""
+    if symptom_matrix is None:
+        raise HTTPException(status_code=503, detail="Symptom matrix is not loaded")
+    return {"symptoms": symptom_matrix.symptom_list()}
+
+
+@app.get("/autocomplete")
+async def autocomplete(q: str = "", limit: int = Query(AUTOCOMPLETE_LIMIT, ge=1, le=MAX_SUGGESTIONS)):
+    """Canonical symptom suggestions (English or Bengali) for a typed prefix, typo tolerant."""
+    if symptom_autocomplete is None:
+        raise HTTPException(status_code=503, detail="Autocomplete index is not loaded")
+    return {"suggestions": symptom_autocomplete.suggest(q, limit=limit)}
+
+
+@app.post("/detect_disease/structured")
+async def detect_disease_structured(symptom_ids: List[int] = Body(...), top_k: int = 5):
+    """Checkbox input: rank diseases by Jaccard overlap with the selected symptom IDs, no model involved."""
+    if symptom_matrix is None:
+        raise HTTPException(status_code=503, detail="Symptom matrix is not loaded")
+    try:
+        disease_list = symptom_matrix.score(symptom_ids, n_results=top_k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"diseases": disease_list}
+
+
+@app.post("/detect_dept")
+async def detect_dept(diseases: List[dict] = Body(...)):
+    """Departments for a disease list as returned by /detect_disease ([{disease: percentage}, ...])."""
+    for i, disease_dict in enumerate(diseases):
+        if len(disease_dict) != 1:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail=f"Item {i} must be a single {{disease: percentage}} pair, got {len(disease_dict)} keys")
+    print("Received disease list for department detection:", diseases)
+    dept_list = await departments_for(diseases)
     print(dept_list)
     return {"departments": dept_list}
 
 
+@app.post("/diagnose")
+async def diagnose(query: str ="depression"):
+    """Retrieval, dedup and department resolution for one query in a single call."""
+    disease_list = await detect_unique_diseases(query)
+    dept_list = await departments_for(disease_list)
+    print(f"Diagnosis for '{query}': {disease_list} -> {dept_list}")
+    return {"diseases": disease_list, "departments": dept_list}
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/diagnose/stream")
+async def diagnose_stream(query: str ="depression"):
+    """
+    Server-Sent Events version of /diagnose. Emits a `diseases` event right
+    after vector search, one `department` event per disease as it resolves,
+    then `done` with all departments in disease order (or `error`).
+    """
+    async def events():
+        try:
+            disease_list = await detect_unique_diseases(query)
+            yield sse_event("diseases", {"diseases": disease_list})
+
+            disease_names = [list(disease_dict.keys())[0] for disease_dict in disease_list]
+            dept_list = [None] * len(disease_names)
+            async for i, dept in iter_departments(disease_names, cache=dept_cache, mode=DEPT_MODE, concurrency=DEPT_CONCURRENCY):
+                dept_list[i] = dept
+                yield sse_event("department", {"index": i, "disease": disease_names[i], "department": dept})
+            yield sse_event("done", {"departments": dept_list})
+        except Exception as e:
+            print(f"[ERROR] Streaming diagnosis failed: {e}", flush=True)
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "query_cache": embedding_cache.stats(),
+        "batcher": detection_batcher.stats(),
+        "dept_cache": dept_cache.stats(),
+        "dept_voting": vote_stats(),
+        "lexical": {"mode": LEXICAL_MODE, **LEXICAL_STATS},
+        "normalizer": dict(symptom_normalizer.stats) if symptom_normalizer is not None else None,
+        "autocomplete": dict(symptom_autocomplete.stats) if symptom_autocomplete is not None else None,
+    }
+
+
+def require_admin(x_admin_token: Annotated[str | None, Header()] = None):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Admin endpoints are disabled (ADMIN_TOKEN is not set); use dept_cache.py invalidate")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
+
+
+@app.post("/dept_cache/invalidate", dependencies=[Depends(require_admin)])
+def invalidate_dept_cache(disease: str = None):
+    """Drop the cached department of one disease, or of every disease when none is given. Requires X-Admin-Token."""
+    removed = dept_cache.invalidate(disease)
+    return {"removed": removed}
+
+
 @app.get("/")
 async def read_root():
     return {"message": "Welcome to HealthPort API"}
@@ -0,0 +1,156 @@
+"""
+In-process micro-batching scheduler for /detect_disease.
+
+Concurrent requests are collected for up to window_ms (or until
+max_batch_size requests are waiting) and handed to process_batch as one
+list, so the model runs one encode and ChromaDB one query per batch instead
+of one per request. Each caller gets back its own result.
+
+When an executor is given, batches run on it instead of the event loop, with
+at most one batch in flight per executor worker.
+"""
+import asyncio
+from collections import Counter
+
+# Upper bounds of the histogram buckets; larger values land in the last, open bucket
+HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _bucket(value):
+    for bound in HISTOGRAM_BUCKETS:
+        if value <= bound:
+            return f"<={bound}"
+    return f">{HISTOGRAM_BUCKETS[-1]}"
+
+
+def _fail(batch, error):
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+class MicroBatcher:
+    def __init__(self, process_batch, window_ms=5.0, max_batch_size=32, executor=None, max_in_flight=1):
+        """
+        process_batch: callable taking a list of items and returning a list of
+        results in the same order
+        executor: concurrent.futures executor that runs process_batch (None runs it inline)
+        max_in_flight: maximum number of batches running on the executor at once
+        """
+        self.process_batch = process_batch
+        self.executor = executor
+        self.max_in_flight = max(1, max_in_flight)
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        self._in_flight = set()
+        # Items already taken off the queue by the batch being collected
+        self._collecting = []
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+        self.batch_size_histogram = Counter()
+        self.queue_depth_histogram = Counter()
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # Fail anything not dispatched yet so callers do not hang on shutdown:
+        # the batch the worker was collecting when cancelled, then the queue
+        pending, self._collecting = self._collecting, []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        _fail(pending, RuntimeError("Batcher stopped"))
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    async def submit(self, item):
+        if self._worker is None:
+            raise RuntimeError("Batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        depth = self._queue.qsize()
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        return await future
+
+    async def _collect(self):
+        batch = self._collecting = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        self._collecting = []
+        return batch
+
+    async def _dispatch(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            if self.executor is None:
+                results = self.process_batch(items)
+            else:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(self.executor, self.process_batch, items)
+        except Exception as e:
+            _fail(batch, e)
+            return
+        except asyncio.CancelledError:
+            _fail(batch, RuntimeError("Batcher stopped"))
+            raise
+        finally:
+            self._slots.release()
+        if len(results) != len(batch):
+            _fail(batch, RuntimeError(f"process_batch returned {len(results)} results for {len(batch)} items"))
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except asyncio.CancelledError:
+                self._slots.release()
+                raise
+            self.batches += 1
+            self.items += len(batch)
+            self.batch_size_histogram[_bucket(len(batch))] += 1
+            self.queue_depth_histogram[_bucket(self._queue.qsize())] += 1
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": len(self._in_flight),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": dict(self.batch_size_histogram),
+            "queue_depth_histogram": dict(self.queue_depth_histogram),
+        }
@@ -0,0 +1,104 @@
+"""
+Concurrency benchmark for the AI service.
+
+Fires --requests /detect_disease calls with --concurrency in flight while a
+probe hits the / health check every --probe-interval seconds, then prints
+p50/p95/p99 latencies for both. Run it against a build before and after a
+change (e.g. with different INFERENCE_WORKERS) to compare tail latency.
+Every query takes the vector path (see QUERIES), whatever LEXICAL_MODE is.
+
+Usage:
+    python bench_concurrency.py --url http://localhost:8000 --requests 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+# Free-text phrasings rather than exact symptom vocabulary: under the default LEXICAL_MODE=auto an
+# all-vocabulary query ("fever, cough") is answered by BM25 alone and never reaches the model,
+# the micro-batcher or the inference pool this benchmark is meant to load
+QUERIES = [
+    "I have had a fever and a bad cough since yesterday",
+    "my head hurts and I feel sick and dizzy",
+    "feeling nervous all the time, my heart races and I can't catch my breath",
+    "stabbing pain in my stomach and I keep throwing up",
+    "red itchy patches on my arms",
+    "my lower back aches when I bend over",
+    "scratchy throat, stuffy nose and a temperature",
+    "feeling low for weeks and I can't sleep at night",
+]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(name, samples):
+    print(f"{name:<16} n={len(samples):<5} "
+          f"p50={percentile(samples, 50) * 1000:8.1f}ms "
+          f"p95={percentile(samples, 95) * 1000:8.1f}ms "
+          f"p99={percentile(samples, 99) * 1000:8.1f}ms "
+          f"max={max(samples, default=0) * 1000:8.1f}ms")
+
+
+async def run(url, total_requests, concurrency, probe_interval, unique):
+    detect_latencies = []
+    probe_latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=url, timeout=120.0) as client:
+        async def detect(i):
+            nonlocal errors
+            query = random.choice(QUERIES)
+            if unique:
+                # Defeat the query-embedding cache so every request does a forward pass
+                query = f"{query}, case {i}"
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/detect_disease", params={"query": query})
+                detect_latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/")
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(probe_interval)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(detect(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    print(f"{total_requests} requests, concurrency {concurrency}, {elapsed:.2f}s "
+          f"({total_requests / elapsed:.1f} req/s), errors={errors}")
+    summarize("/detect_disease", detect_latencies)
+    summarize("/ (health)", probe_latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrency benchmark for /detect_disease")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    parser.add_argument("--unique", action="store_true", help="Make every query unique to bypass caching")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.requests, args.concurrency, args.probe_interval, args.unique))
+
+
+if __name__ == "__main__":
+    main()
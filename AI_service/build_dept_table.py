@@ -0,0 +1,135 @@
+"""
+Offline job that precomputes a department for every known disease.
+
+Disease names come from merged_disease_symptoms.json and the `response`
+column of the training CSVs. Each one is resolved by the static
+department_mapping table when it has an exact entry or synonym, otherwise
+by the batched LLM classification prompt (in chunks). Diseases left over
+stay out of the table (the service tries the cache and the LLM for them
+before any partial static match); how many of them have a partial match is
+reported under sources["partial"]. The result is written as a compact versioned JSON artifact
+that ai.py loads at startup (DEPT_TABLE_PATH), so online requests almost
+never need the LLM.
+
+Usage:
+    python build_dept_table.py
+    python build_dept_table.py --no-llm --out dept_table.json
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+DEFAULT_JSON = "../merged_disease_symptoms.json"
+DEFAULT_CSVS = ["dataset/data_sample.csv", "dataset/data_textual.csv"]
+DEFAULT_TABLE_PATH = "dept_table.json"
+DEFAULT_CHUNK_SIZE = 40
+
+
+def collect_diseases(json_path=DEFAULT_JSON, csv_paths=DEFAULT_CSVS):
+    diseases = set()
+    if json_path and os.path.exists(json_path):
+        with open(json_path, encoding="utf-8") as f:
+            diseases.update(json.load(f).keys())
+    for csv_path in csv_paths or []:
+        if os.path.exists(csv_path):
+            diseases.update(pd.read_csv(csv_path, usecols=['response'])['response'].dropna().astype(str))
+    return sorted({" ".join(disease.lower().split()) for disease in diseases} - {""})
+
+
+def build_dept_table(json_path=DEFAULT_JSON, csv_paths=DEFAULT_CSVS, out_path=DEFAULT_TABLE_PATH,
+                     use_llm=True, chunk_size=DEFAULT_CHUNK_SIZE):
+    from department_mapping import lookup_department, match_department
+
+    start = time.perf_counter()
+    diseases = collect_diseases(json_path, csv_paths)
+    print(f"[DEPT TABLE] {len(diseases)} distinct diseases", flush=True)
+
+    table = {}
+    sources = {"static": 0, "llm": 0, "partial": 0, "unresolved": 0}
+    for disease in diseases:
+        dept = lookup_department(disease)
+        if dept is not None:
+            table[disease] = dept
+            sources["static"] += 1
+
+    pending = [disease for disease in diseases if disease not in table]
+    if use_llm and pending:
+        from dept import dept_classify_batch
+        for i in range(0, len(pending), chunk_size):
+            chunk = pending[i:i + chunk_size]
+            try:
+                answers = dept_classify_batch(chunk)
+            except Exception as e:
+                print(f"[DEPT TABLE] Chunk {i // chunk_size + 1} failed: {e}", flush=True)
+                continue
+            for disease, dept in zip(chunk, answers):
+                if dept:
+                    table[disease] = dept
+                    sources["llm"] += 1
+            print(f"[DEPT TABLE] LLM chunk {i // chunk_size + 1}/{(len(pending) - 1) // chunk_size + 1} "
+                  f"({len(table)}/{len(diseases)} resolved)", flush=True)
+
+    # Partial (substring) matches are too often wrong to ship as table entries; they are
+    # only counted here, the service still tries them once the cache and the LLM miss
+    for disease in diseases:
+        if disease in table:
+            continue
+        sources["unresolved"] += 1
+        if match_department(disease) is not None:
+            sources["partial"] += 1
+
+    # Store each department name once and refer to it by index
+    departments = sorted(set(table.values()))
+    dept_index = {dept: i for i, dept in enumerate(departments)}
+    build_seconds = round(time.perf_counter() - start, 3)
+    artifact = {
+        "version": datetime.now(timezone.utc).strftime("v%Y%m%d-%H%M%S"),
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "coverage": {
+            "diseases": len(diseases),
+            "resolved": len(table),
+            "ratio": round(len(table) / len(diseases), 4) if diseases else 0.0,
+            "sources": sources,
+        },
+        "build_seconds": build_seconds,
+        "departments": departments,
+        "diseases": {disease: dept_index[dept] for disease, dept in sorted(table.items())},
+    }
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, separators=(",", ":"))
+    os.replace(tmp_path, out_path)
+
+    coverage = artifact["coverage"]
+    print(f"[DEPT TABLE] {artifact['version']} written to {out_path}: "
+          f"{coverage['resolved']}/{coverage['diseases']} diseases ({coverage['ratio'] * 100:.1f}%), "
+          f"sources={sources}, built in {build_seconds}s", flush=True)
+    return artifact
+
+
+def load_dept_table(path=DEFAULT_TABLE_PATH):
+    """Read an artifact written by build_dept_table. Returns (version, {disease: department})."""
+    with open(path, encoding="utf-8") as f:
+        artifact = json.load(f)
+    departments = artifact["departments"]
+    return artifact["version"], {disease: departments[i] for disease, i in artifact["diseases"].items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the disease -> department lookup table")
+    parser.add_argument("--json", default=DEFAULT_JSON)
+    parser.add_argument("--csv", nargs="*", default=DEFAULT_CSVS)
+    parser.add_argument("--out", default=DEFAULT_TABLE_PATH)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--no-llm", action="store_true", help="Only use the static mapping")
+    args = parser.parse_args()
+    build_dept_table(args.json, args.csv, args.out, use_llm=not args.no_llm, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Offline index builder for the disease_symptoms collection.
+
+Builds a versioned ChromaDB snapshot from the training CSV and
+merged_disease_symptoms.json so the web process only has to open it
+(INDEX_MODE=prebuilt) instead of embedding on first boot.
+
+Layout of the index root:
+    indexes/
+        CURRENT                 <- name of the active version
+        <version>/manifest.json
+        <version>/chroma_db/
+        <version>/numpy/        <- mmap exact-search store (VECTOR_BACKEND=numpy)
+        <version>/lexical/      <- BM25 symptom-phrase index (LEXICAL_MODE)
+        <version>/centroid/     <- per-disease centroids over numpy/ (VECTOR_BACKEND=centroid)
+        <version>/ivfpq/        <- optional IVF-PQ index over numpy/ (--ivfpq, VECTOR_BACKEND=ivfpq)
+        <version>/shards/       <- optional numpy/ split into N shards (--shards N, VECTOR_BACKEND=sharded)
+
+Usage:
+    python build_index.py                       # build a new version and activate it
+    python build_index.py --version v2 --no-activate
+    python build_index.py --base v1             # copy v1 and only re-embed changed rows
+    python build_index.py --ivfpq               # also train the compressed IVF-PQ index
+    python build_index.py --shards 4            # also split the store for multi-process search
+    python build_index.py --list
+    python build_index.py --activate v1         # roll back to an older index
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+COLLECTION_NAME = "disease_symptoms"
+CURRENT_POINTER = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+DEFAULT_CSV = "dataset/data_textual.csv"
+DEFAULT_JSON = "../merged_disease_symptoms.json"
+DEFAULT_INDEX_ROOT = "indexes"
+
+
+def load_corpus(csv_path=DEFAULT_CSV, json_path=DEFAULT_JSON):
+    """
+    Load the (id, query, response) rows to embed.
+    Each disease in merged_disease_symptoms.json becomes one extra row whose
+    query is its comma-separated symptom list.
+    """
+    frames = []
+    if csv_path:
+        df = pd.read_csv(csv_path)
+        frames.append(df[['id', 'query', 'response']].astype({'id': str}))
+
+    if json_path:
+        with open(json_path, encoding="utf-8") as f:
+            disease_symptoms = json.load(f)
+        frames.append(pd.DataFrame(
+            [
+                {"id": f"json-{i}", "query": ", ".join(symptoms), "response": disease}
+                for i, (disease, symptoms) in enumerate(sorted(disease_symptoms.items()))
+            ],
+            columns=['id', 'query', 'response']
+        ))
+
+    if not frames:
+        raise ValueError("At least one of csv_path or json_path is required")
+    return pd.concat(frames, ignore_index=True)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_versions(index_root=DEFAULT_INDEX_ROOT):
+    if not os.path.isdir(index_root):
+        return []
+    return sorted(
+        name for name in os.listdir(index_root)
+        if not name.startswith(".") and os.path.isfile(os.path.join(index_root, name, MANIFEST_FILE))
+    )
+
+
+def current_version(index_root=DEFAULT_INDEX_ROOT):
+    pointer = os.path.join(index_root, CURRENT_POINTER)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def activate_version(version, index_root=DEFAULT_INDEX_ROOT):
+    """Point CURRENT at version. The pointer is replaced atomically."""
+    if version not in list_versions(index_root):
+        raise ValueError(f"Unknown index version '{version}' in {index_root}")
+    pointer = os.path.join(index_root, CURRENT_POINTER)
+    tmp_pointer = pointer + ".tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp_pointer, pointer)
+
+
+def resolve_index_dir(index_root=DEFAULT_INDEX_ROOT, version=None):
+    """Return the directory of version, or of the CURRENT version when version is None."""
+    version = version or current_version(index_root)
+    if version is None:
+        raise FileNotFoundError(f"No {CURRENT_POINTER} pointer in {index_root}. Run build_index.py first.")
+    index_dir = os.path.join(index_root, version)
+    if not os.path.isfile(os.path.join(index_dir, MANIFEST_FILE)):
+        raise FileNotFoundError(f"Index version '{version}' not found in {index_root}")
+    return index_dir
+
+
+def read_manifest(index_dir):
+    with open(os.path.join(index_dir, MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_index(csv_path=DEFAULT_CSV, json_path=DEFAULT_JSON, index_root=DEFAULT_INDEX_ROOT,
+                version=None, batch_size=None, activate=True, base_version=None, ivfpq=False,
+                shards=0, dedup="exact", embed_cache_dir=None):
+    """
+    Embed the corpus into a fresh ChromaDB snapshot under index_root/version.
+    With base_version the new snapshot starts as a copy of that version and is
+    brought up to date with sync_data, so only new or changed rows are embedded.
+    With ivfpq an IVF-PQ index is trained over the exported NumPy store, and
+    with shards > 0 the store is also split into that many shards.
+    dedup ("off", "exact" or "subset") canonicalizes and deduplicates the
+    corpus first (see corpus_dedup.py). embed_cache_dir reuses and fills the
+    on-disk embedding cache, so rebuilding unchanged text skips the model.
+    Everything is built in index_root/.tmp-<version> and renamed to
+    index_root/version only once the manifest is written, so a failed build
+    never shows up as a version (or blocks rebuilding it).
+    """
+    version = version or datetime.now(timezone.utc).strftime("v%Y%m%d-%H%M%S")
+    index_dir = os.path.join(index_root, version)
+    if os.path.exists(index_dir):
+        raise FileExistsError(f"Index version '{version}' already exists in {index_root}")
+    build_dir = os.path.join(index_root, f".tmp-{version}")
+    # Left over from an interrupted build of the same version
+    shutil.rmtree(build_dir, ignore_errors=True)
+
+    try:
+        if base_version:
+            base_dir = resolve_index_dir(index_root, base_version)
+            shutil.copytree(os.path.join(base_dir, "chroma_db"), os.path.join(build_dir, "chroma_db"))
+        else:
+            os.makedirs(build_dir)
+        manifest = _build_into(build_dir, version, csv_path, json_path, batch_size, base_version,
+                               ivfpq, shards, dedup, embed_cache_dir)
+        os.rename(build_dir, index_dir)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    print(f"[BUILD] Index {version} written to {index_dir} in {manifest['build_seconds']}s", flush=True)
+
+    if activate:
+        activate_version(version, index_root)
+        print(f"[BUILD] {CURRENT_POINTER} -> {version}", flush=True)
+    return manifest
+
+
+def _build_into(index_dir, version, csv_path, json_path, batch_size, base_version, ivfpq, shards, dedup, embed_cache_dir):
+    """Build every file of a version, manifest last, into index_dir."""
+    import chromadb
+    from embed_data import embed_data, sync_data, load_embed_model, open_disk_cache, EMBED_MODEL_NAME, DEFAULT_BATCH_SIZE
+
+    start = time.perf_counter()
+    df = load_corpus(csv_path, json_path)
+    print(f"[BUILD] Loaded {len(df)} rows ({df['response'].nunique()} diseases)", flush=True)
+    dedup_report = None
+    if dedup != "off":
+        from corpus_dedup import dedupe_corpus
+        df, dedup_report = dedupe_corpus(df, drop_subsets=dedup == "subset")
+
+    model_embed = load_embed_model(EMBED_MODEL_NAME)
+    client = chromadb.PersistentClient(path=os.path.join(index_dir, "chroma_db"))
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    disk_cache = open_disk_cache(model_embed, embed_cache_dir)
+    if base_version:
+        stats = sync_data(df, model_embed, collection, batch_size=batch_size, disk_cache=disk_cache)
+    else:
+        stats = embed_data(df, model_embed, collection, batch_size=batch_size, disk_cache=disk_cache)
+
+    from vector_store import NumpyVectorStore
+    store = NumpyVectorStore.from_collection(collection, os.path.join(index_dir, "numpy"))
+    from lexical_index import LexicalIndex, load_vocabulary, rows_from_collection
+    LexicalIndex.from_rows(rows_from_collection(store), load_vocabulary()).save(os.path.join(index_dir, "lexical"))
+    from centroid_index import build_centroid_index
+    build_centroid_index(store, os.path.join(index_dir, "centroid"))
+    backends = ["chroma", "numpy", "centroid"]
+    ivfpq_memory = None
+    if ivfpq:
+        from ivfpq import build_ivfpq
+        ivfpq_memory = build_ivfpq(store, os.path.join(index_dir, "ivfpq")).memory_report()
+        backends.append("ivfpq")
+    if shards:
+        import sharded_store
+        sharded_store.split_store(store, os.path.join(index_dir, "shards"), shards).close()
+        backends.append("sharded")
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "collection": COLLECTION_NAME,
+        "model": EMBED_MODEL_NAME,
+        "backends": backends,
+        "ivfpq": ivfpq_memory,
+        "shards": shards or None,
+        "rows": collection.count(),
+        "sources": {
+            path: file_sha256(path) for path in (csv_path, json_path) if path
+        },
+        "base_version": base_version,
+        "build_seconds": round(time.perf_counter() - start, 3),
+        "ingest": stats,
+        "dedup": dedup_report,
+    }
+    with open(os.path.join(index_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    # Close Chroma's SQLite handles before the directory is renamed
+    client.clear_system_cache()
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or manage prebuilt disease_symptoms index snapshots")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="Training CSV with id, query, response columns")
+    parser.add_argument("--json", default=DEFAULT_JSON, help="merged_disease_symptoms.json ('' to skip)")
+    parser.add_argument("--index-root", default=DEFAULT_INDEX_ROOT)
+    parser.add_argument("--version", help="Version name (defaults to a UTC timestamp)")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--base", metavar="VERSION", help="Start from an existing version and sync incrementally")
+    parser.add_argument("--ivfpq", action="store_true", help="Also build the IVF-PQ index (VECTOR_BACKEND=ivfpq)")
+    parser.add_argument("--shards", type=int, default=0, help="Also split the store into N shards (VECTOR_BACKEND=sharded)")
+    parser.add_argument("--dedup", choices=["off", "exact", "subset"], default="exact",
+                        help="Drop exact duplicate symptom lists per disease before embedding (subset: also rows covered by another row)")
+    parser.add_argument("--embed-cache", default="embedding_cache",
+                        help="On-disk embedding cache shared by all versions ('' to disable)")
+    parser.add_argument("--no-activate", action="store_true", help="Build without moving the CURRENT pointer")
+    parser.add_argument("--list", action="store_true", help="List built versions")
+    parser.add_argument("--activate", metavar="VERSION", help="Point CURRENT at an existing version")
+    args = parser.parse_args()
+
+    if args.list:
+        active = current_version(args.index_root)
+        for version in list_versions(args.index_root):
+            manifest = read_manifest(os.path.join(args.index_root, version))
+            marker = "*" if version == active else " "
+            print(f"{marker} {version}  rows={manifest['rows']}  created={manifest['created_at']}")
+        return
+
+    if args.activate:
+        activate_version(args.activate, args.index_root)
+        print(f"[BUILD] {CURRENT_POINTER} -> {args.activate}")
+        return
+
+    build_index(
+        csv_path=args.csv or None,
+        json_path=args.json or None,
+        index_root=args.index_root,
+        version=args.version,
+        batch_size=args.batch_size,
+        activate=not args.no_activate,
+        base_version=args.base,
+        ivfpq=args.ivfpq,
+        shards=args.shards,
+        dedup=args.dedup,
+        embed_cache_dir=args.embed_cache or None,
+    )
+
+
+if __name__ == "__main__":
+    main()
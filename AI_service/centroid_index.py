@@ -0,0 +1,109 @@
+"""
+Two-stage per-disease retrieval over a NumPy vector store (VECTOR_BACKEND=centroid).
+
+Stage one scores one normalized mean vector per disease label and keeps the
+`shortlist` best diseases; stage two re-ranks those diseases by the best
+exact cosine among their own rows (read from the mmap'd float16 store).
+Each result is a different disease, represented by its best matching row, so
+n_results=5 always yields 5 distinct diseases after dedupe_diseases, and the
+search cost is bounded by the number of diseases rather than rows.
+
+Usage:
+    python centroid_index.py --store indexes/<version>/numpy --out indexes/<version>/centroid
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from vector_store import NumpyVectorStore, normalize_rows, query_result, top_k
+
+INDEX_FILE = "centroids.npz"
+
+DEFAULT_SHORTLIST = 20
+BUILD_CHUNK_ROWS = 65536
+
+
+def build_centroid_index(store, path):
+    """One centroid per disease label, plus the store rows grouped by disease."""
+    start = time.perf_counter()
+    labels, label_ids = np.unique(np.asarray(store.diseases, dtype=object), return_inverse=True)
+    sums = np.zeros((len(labels), store.embeddings.shape[1]), dtype=np.float32)
+    for chunk_start in range(0, store.count(), BUILD_CHUNK_ROWS):
+        chunk = np.asarray(store.embeddings[chunk_start:chunk_start + BUILD_CHUNK_ROWS], dtype=np.float32)
+        np.add.at(sums, label_ids[chunk_start:chunk_start + len(chunk)], chunk)
+
+    # Rows of disease i are members[offsets[i]:offsets[i + 1]]
+    members = np.argsort(label_ids, kind="stable")
+    offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(label_ids, minlength=len(labels)))
+
+    os.makedirs(path, exist_ok=True)
+    np.savez(
+        os.path.join(path, INDEX_FILE),
+        centroids=normalize_rows(sums),
+        diseases=np.asarray(labels, dtype=str),
+        members=members.astype(np.int32),
+        offsets=offsets,
+    )
+    print(f"[CENTROID] {len(labels)} disease centroids over {store.count()} rows written to {path} "
+          f"in {time.perf_counter() - start:.2f}s", flush=True)
+    return CentroidIndex(path, store)
+
+
+class CentroidIndex:
+    def __init__(self, path, store, shortlist=DEFAULT_SHORTLIST):
+        self.path = path
+        self.store = store
+        self.shortlist = shortlist
+        with np.load(os.path.join(path, INDEX_FILE)) as data:
+            self.centroids = data["centroids"]
+            self.diseases = data["diseases"].tolist()
+            self.members = data["members"]
+            self.offsets = data["offsets"]
+        if len(self.members) != store.count():
+            raise ValueError(f"Centroid index at {path} covers {len(self.members)} rows, store has {store.count()}")
+
+    @staticmethod
+    def exists(path):
+        return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+    def count(self):
+        return self.store.count()
+
+    def search(self, query_embeddings, n_results=5):
+        """Top distinct diseases per query: returns (best row per disease, cosine scores)."""
+        queries = normalize_rows(query_embeddings)
+        shortlist = max(self.shortlist, n_results)
+        candidates = top_k(queries @ self.centroids.T, shortlist)
+        all_rows, all_scores = [], []
+        for query, diseases in zip(queries, candidates):
+            best_rows = np.empty(len(diseases), dtype=np.int64)
+            best_scores = np.empty(len(diseases), dtype=np.float32)
+            for i, disease in enumerate(diseases):
+                rows = np.sort(self.members[self.offsets[disease]:self.offsets[disease + 1]].astype(np.int64))
+                scores = np.asarray(self.store.embeddings[rows], dtype=np.float32) @ query
+                best = int(np.argmax(scores))
+                best_rows[i], best_scores[i] = rows[best], scores[best]
+            keep = top_k(best_scores[None, :], n_results)[0]
+            all_rows.append(best_rows[keep])
+            all_scores.append(best_scores[keep])
+        return all_rows, all_scores
+
+    def query(self, query_embeddings, n_results=5, **kwargs):
+        """Chroma-compatible query(), same shape as NumpyVectorStore.query."""
+        rows, scores = self.search(query_embeddings, n_results)
+        return query_result(self.store, rows, scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-disease centroid index over a NumPy vector store")
+    parser.add_argument("--store", required=True, help="NumpyVectorStore directory")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    build_centroid_index(NumpyVectorStore(args.store), args.out)
+
+
+if __name__ == "__main__":
+    main()
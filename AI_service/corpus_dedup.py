@@ -0,0 +1,116 @@
+"""
+Corpus canonicalization and deduplication ahead of embedding.
+
+Training rows list the same disease many times with permuted or partial
+symptom lists ("a ,b ,c " / "c, a" / "b ,a ,c"). Before ingestion every
+query is rewritten to its canonical form (unique phrases, sorted, ", "
+separated) and, per disease:
+  - exact duplicates (same symptom set) keep only their first row
+  - with drop_subsets, subset duplicates (symptom set strictly contained in
+    another row of the same disease) are dropped as well. Off by default:
+    on data_sample.csv it collapses every disease to its largest row
+Diseases are grouped case- and whitespace-insensitively, but kept rows keep
+their original id and `response` text, so sync_data deletes the dropped
+ones from an existing index.
+
+Usage:
+    python corpus_dedup.py dataset/data_sample.csv
+    python corpus_dedup.py dataset/data_sample.csv --drop-subsets
+"""
+import argparse
+import json
+import time
+from collections import Counter
+
+from lexical_index import canonical_phrase
+from symptom_text import split_symptoms
+
+
+def canonical_symptoms(text):
+    return frozenset(canonical_phrase(phrase) for phrase in split_symptoms(text))
+
+
+def dedupe_corpus(df, drop_subsets=False):
+    """
+    Canonicalize and deduplicate the (id, query, response) rows of df.
+    Returns (deduplicated df, reduction report).
+    """
+    start = time.perf_counter()
+    diseases = df['response'].astype(str).map(lambda d: " ".join(d.lower().split()))
+    symptom_sets = df['query'].map(canonical_symptoms)
+
+    keep = [False] * len(df)
+    dropped = Counter()
+    exact = subset = empty = 0
+    rows_by_disease = {}
+    for position, (disease, symptoms) in enumerate(zip(diseases, symptom_sets)):
+        rows_by_disease.setdefault(disease, []).append(position)
+
+    for disease, positions in rows_by_disease.items():
+        seen = set()
+        # Largest symptom sets first, so any strict superset is kept before its subsets
+        ordered = sorted(positions, key=lambda p: (-len(symptom_sets.iat[p]), p))
+        # symptom -> bitmask over the kept rows of this disease that list it
+        kept_with = {}
+        kept = 0
+        for position in ordered:
+            symptoms = symptom_sets.iat[position]
+            if not symptoms:
+                empty += 1
+                dropped[disease] += 1
+                continue
+            if symptoms in seen:
+                exact += 1
+                dropped[disease] += 1
+                continue
+            if drop_subsets:
+                supersets = -1
+                for symptom in symptoms:
+                    supersets &= kept_with.get(symptom, 0)
+                    if not supersets:
+                        break
+                if supersets:
+                    subset += 1
+                    dropped[disease] += 1
+                    continue
+            seen.add(symptoms)
+            for symptom in symptoms:
+                kept_with[symptom] = kept_with.get(symptom, 0) | (1 << kept)
+            kept += 1
+            keep[position] = True
+
+    result = df[keep].copy()
+    result['query'] = [", ".join(sorted(symptoms)) for symptoms in symptom_sets[keep]]
+
+    report = {
+        "rows_in": len(df),
+        "rows_out": len(result),
+        "exact_duplicates": exact,
+        "subset_duplicates": subset,
+        "empty": empty,
+        "reduction": round(1 - len(result) / len(df), 4) if len(df) else 0.0,
+        "most_reduced": dict(dropped.most_common(5)),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    print(f"[DEDUP] {report['rows_in']} -> {report['rows_out']} rows ({report['reduction'] * 100:.1f}% smaller): "
+          f"{exact} exact, {subset} subset, {empty} empty duplicates dropped in {report['seconds']}s", flush=True)
+    return result, report
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Report the canonicalization/dedup reduction of a training CSV")
+    parser.add_argument("csv")
+    parser.add_argument("--drop-subsets", action="store_true", help="Also drop rows whose symptoms are a subset of another row")
+    parser.add_argument("--out", help="Write the deduplicated CSV here")
+    args = parser.parse_args()
+
+    df, report = dedupe_corpus(pd.read_csv(args.csv), drop_subsets=args.drop_subsets)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        df.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
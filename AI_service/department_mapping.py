@@ -2,6 +2,7 @@
 Static disease-to-department mapping for faster responses
 Avoids slow LLM API calls for common diseases
 """
+import re
 
 DISEASE_DEPARTMENT_MAP = {
     # Mental Health
@@ -63,6 +64,18 @@ DISEASE_DEPARTMENT_MAP = {
     "acne": "Dermatology",
     "skin infection": "Dermatology",
 
+    # Ophthalmology
+    "retinopathy": "Ophthalmology",
+    "retinal detachment": "Ophthalmology",
+    "glaucoma": "Ophthalmology",
+    "cataract": "Ophthalmology",
+    "conjunctivitis": "Ophthalmology",
+    "macular degeneration": "Ophthalmology",
+    "uveitis": "Ophthalmology",
+    "optic neuritis": "Ophthalmology",
+    "dry eye": "Ophthalmology",
+    "eyelid": "Ophthalmology",
+
     # General Practice (fallback)
     "fever": "General Practice",
     "cold": "General Practice",
@@ -70,21 +83,297 @@ DISEASE_DEPARTMENT_MAP = {
     "cough": "General Practice",
 }
 
+# Alternative names -> key in DISEASE_DEPARTMENT_MAP
+DISEASE_SYNONYMS = {
+    "major depressive disorder": "depression",
+    "generalized anxiety disorder": "anxiety",
+    "post-traumatic stress disorder": "ptsd",
+    "obsessive compulsive disorder": "ocd",
+    "myocardial infarction": "heart attack",
+    "high blood pressure": "hypertension",
+    "cardiac arrhythmia": "arrhythmia",
+    "chronic obstructive pulmonary disease": "copd",
+    "irritable bowel syndrome": "ibs",
+    "peptic ulcer": "ulcer",
+    "diabetes mellitus": "diabetes",
+    "influenza": "flu",
+    "common cold": "cold",
+    "atopic dermatitis": "eczema",
+}
+
+# Specialty names seeded by backend-fastapi/seed_data.seed_specialties.
+# Department answers are canonicalized to these so they match doctors' specialties.
+SPECIALTIES = [
+    "Accident and Emergency Medicine", "Allergology", "Anaesthetics", "Biological Hematology",
+    "Cardiology", "Child Psychiatry", "Clinical Biology", "Clinical Chemistry",
+    "Clinical Neurophysiology", "Clinical Radiology", "Dental, Oral and Maxillo-Facial Surgery",
+    "Dermato-Venereology", "Dermatology", "Endocrinology", "Gastro-Enterologic Surgery",
+    "Gastroenterology", "General Hematology", "General Practice", "General Surgery",
+    "Geriatrics", "Immunology", "Infectious Diseases", "Internal Medicine",
+    "Laboratory Medicine", "Maxillo-Facial Surgery", "Microbiology", "Nephrology",
+    "Neuro-Psychiatry", "Neurology", "Neurosurgery", "Nuclear Medicine",
+    "Obstetrics and Gynecology", "Occupational Medicine", "Ophthalmology",
+    "Orthopaedics", "Otorhinolaryngology", "Paediatric Surgery", "Paediatrics",
+    "Pathology", "Pharmacology", "Physical Medicine and Rehabilitation",
+    "Plastic Surgery", "Podiatric Medicine", "Podiatric Surgery", "Psychiatry",
+    "Public Health and Preventive Medicine", "Radiology", "Radiotherapy",
+    "Respiratory Medicine", "Rheumatology", "Stomatology", "Thoracic Surgery",
+    "Tropical Medicine", "Urology", "Vascular Surgery", "Venereology"
+]
+
+# Common LLM spellings of a department -> seeded specialty name
+DEPARTMENT_ALIASES = {
+    "orthopedics": "Orthopaedics",
+    "orthopedic surgery": "Orthopaedics",
+    "orthopaedic surgery": "Orthopaedics",
+    "pediatrics": "Paediatrics",
+    "pediatric surgery": "Paediatric Surgery",
+    "pulmonology": "Respiratory Medicine",
+    "pulmonary medicine": "Respiratory Medicine",
+    "respiratory": "Respiratory Medicine",
+    "ent": "Otorhinolaryngology",
+    "ear nose and throat": "Otorhinolaryngology",
+    "otolaryngology": "Otorhinolaryngology",
+    "gynecology": "Obstetrics and Gynecology",
+    "gynaecology": "Obstetrics and Gynecology",
+    "obstetrics and gynaecology": "Obstetrics and Gynecology",
+    "obgyn": "Obstetrics and Gynecology",
+    "ob/gyn": "Obstetrics and Gynecology",
+    "mental health": "Psychiatry",
+    "hepatology": "Gastroenterology",
+    "emergency medicine": "Accident and Emergency Medicine",
+    "emergency": "Accident and Emergency Medicine",
+    "family medicine": "General Practice",
+    "primary care": "General Practice",
+    "general medicine": "Internal Medicine",
+    "hematology": "General Hematology",
+    "haematology": "General Hematology",
+    "infectious disease": "Infectious Diseases",
+    "allergy": "Allergology",
+    "allergy and immunology": "Allergology",
+    "cardiac": "Cardiology",
+    "neurological": "Neurology",
+}
+
+_KNOWN_DEPARTMENTS = {name.lower(): name for name in SPECIALTIES}
+_KNOWN_DEPARTMENTS.update({name.lower(): name for name in DISEASE_DEPARTMENT_MAP.values()})
+_KNOWN_DEPARTMENTS.update(DEPARTMENT_ALIASES)
+
+
+def canonical_department(text: str) -> str:
+    """
+    Clean a free-text department answer ("**Department of Orthopedics.**")
+    and map it to its canonical name ("Orthopaedics") when it is a known
+    department or alias. Unknown answers are returned cleaned but otherwise as-is.
+    """
+    lines = [line for line in str(text).strip().splitlines() if line.strip()]
+    cleaned = lines[0] if lines else ""
+    cleaned = re.sub(r"[*_`#\"]", "", cleaned).replace("&", "and").strip(" .:-")
+    cleaned = re.sub(r"^(the\s+)?(department|dept)\s+of\s+", "", cleaned, flags=re.I)
+    cleaned = re.sub(r"\s+(department|dept)$", "", cleaned, flags=re.I)
+    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+    return _KNOWN_DEPARTMENTS.get(cleaned.lower(), cleaned)
+
+
+# Connectives between a condition and its cause ("retinopathy due to high blood pressure")
+_CAUSE = re.compile(r"\s+(?:due to|caused by|secondary to|induced by|associated with|from)\s+")
+
+
+class DepartmentMatcher:
+    """
+    Disease -> department lookup compiled once from a disease map.
+
+    Matching order, each deterministic:
+    0. for "X due to Y" style names, X alone first: X is the condition
+       (and decides the department), Y only names its cause
+    1. exact name (or synonym)
+    2. the longest map key contained in the disease name, found with an
+       Aho-Corasick automaton in one pass over the name
+    3. the shortest map key containing the disease name at a word start,
+       found by walking a trie of the keys' word suffixes
+    Ties go to the key that was added first. Lookup cost depends on the length
+    of the disease name, not on the size of the map.
+    """
+
+    # Shorter names are too ambiguous for the "name inside a key" match
+    MIN_CONTAINED_LENGTH = 3
+
+    def __init__(self, mapping, synonyms=None):
+        patterns = {}
+        for key, dept in mapping.items():
+            patterns.setdefault(key.lower().strip(), dept)
+        for alias, key in (synonyms or {}).items():
+            dept = mapping.get(key)
+            if dept is not None:
+                patterns.setdefault(alias.lower().strip(), dept)
+        patterns.pop("", None)
+
+        self._exact = patterns
+        # Insertion order breaks ties between equally long patterns
+        self._order = {pattern: i for i, pattern in enumerate(patterns)}
+        self._build_automaton()
+        self._build_suffix_trie()
+
+    def __len__(self):
+        return len(self._exact)
+
+    def _better_longest(self, candidate, current):
+        if current is None:
+            return candidate
+        if len(candidate) != len(current):
+            return candidate if len(candidate) > len(current) else current
+        return candidate if self._order[candidate] < self._order[current] else current
+
+    def _better_shortest(self, candidate, current):
+        if current is None:
+            return candidate
+        if len(candidate) != len(current):
+            return candidate if len(candidate) < len(current) else current
+        return candidate if self._order[candidate] < self._order[current] else current
+
+    def _build_automaton(self):
+        goto = [{}]
+        output = [None]
+        for pattern in self._exact:
+            node = 0
+            for ch in pattern:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    output.append(None)
+                node = nxt
+            output[node] = pattern
+
+        # Breadth-first failure links; each node's output becomes the best
+        # pattern ending at it, including those reached through failure links
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in goto[node].items():
+                queue.append(child)
+                if node:
+                    state = fail[node]
+                    while state and ch not in goto[state]:
+                        state = fail[state]
+                    fail[child] = goto[state].get(ch, 0)
+                inherited = output[fail[child]]
+                if inherited is not None:
+                    output[child] = self._better_longest(inherited, output[child])
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def _build_suffix_trie(self):
+        trie = [{}]
+        best = [None]
+        for pattern in self._exact:
+            starts = [0] + [m.end() for m in re.finditer(r"[\s\-/,(]+", pattern)]
+            for start in starts:
+                node = 0
+                for ch in pattern[start:]:
+                    nxt = trie[node].get(ch)
+                    if nxt is None:
+                        nxt = len(trie)
+                        trie[node][ch] = nxt
+                        trie.append({})
+                        best.append(None)
+                    node = nxt
+                    best[node] = self._better_shortest(pattern, best[node])
+        self._suffix_trie = trie
+        self._suffix_best = best
+
+    def _longest_contained(self, text):
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        found = None
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node] is not None:
+                found = self._better_longest(output[node], found)
+        return found
+
+    def _shortest_containing(self, text):
+        if len(text) < self.MIN_CONTAINED_LENGTH:
+            return None
+        node = 0
+        for ch in text:
+            node = self._suffix_trie[node].get(ch)
+            if node is None:
+                return None
+        return self._suffix_best[node]
+
+    def match_exact(self, disease):
+        """Department for an exact name or synonym hit only, or None."""
+        return self._exact.get(" ".join(str(disease).lower().split()))
+
+    def match(self, disease):
+        """Department for disease, or None when nothing in the map matches."""
+        text = " ".join(str(disease).lower().split())
+        if not text:
+            return None
+        if text in self._exact:
+            return self._exact[text]
+        head = _CAUSE.split(text, 1)[0]
+        if head != text:
+            dept = self.match(head)
+            if dept is not None:
+                return dept
+        pattern = self._longest_contained(text) or self._shortest_containing(text)
+        return self._exact[pattern] if pattern is not None else None
+
+    def match_many(self, diseases):
+        """Batched match(); repeated names are only matched once."""
+        memo = {}
+        return [memo[d] if d in memo else memo.setdefault(d, self.match(d)) for d in diseases]
+
+
+_MATCHER = DepartmentMatcher(DISEASE_DEPARTMENT_MAP, DISEASE_SYNONYMS)
+
+
+def extend_department_map(mapping):
+    """Add disease -> department entries (existing entries win) and recompile the matcher."""
+    global _MATCHER
+    for disease, dept in mapping.items():
+        DISEASE_DEPARTMENT_MAP.setdefault(disease.lower().strip(), dept)
+    _MATCHER = DepartmentMatcher(DISEASE_DEPARTMENT_MAP, DISEASE_SYNONYMS)
+    return len(_MATCHER)
+
+
+def lookup_department(disease: str):
+    """Department for an exact name or synonym in the static map, or None."""
+    return _MATCHER.match_exact(disease)
+
+
+def match_department(disease: str):
+    """
+    Department for disease from the static map including partial (substring)
+    matches, or None when it is not covered. Partial matches are often wrong
+    ("herpangina" contains "angina"), so only use this as a last resort.
+    """
+    return _MATCHER.match(disease)
+
+
 def get_department_for_disease(disease: str) -> str:
     """
     Get department for a disease using static mapping
     Falls back to General Practice if disease not found
     """
-    disease_lower = disease.lower().strip()
-
-    # Direct lookup
-    if disease_lower in DISEASE_DEPARTMENT_MAP:
-        return DISEASE_DEPARTMENT_MAP[disease_lower]
-
-    # Partial match
-    for disease_key, dept in DISEASE_DEPARTMENT_MAP.items():
-        if disease_key in disease_lower or disease_lower in disease_key:
-            return dept
+    # Exact, then partial match through the compiled matcher
+    dept = _MATCHER.match(disease)
+    if dept is not None:
+        return dept
 
     # Default fallback
     return "General Practice"
+
+
+def get_departments_for_diseases(diseases) -> list:
+    """Batched get_department_for_disease for a whole disease list"""
+    return [dept or "General Practice" for dept in _MATCHER.match_many(diseases)]
@@ -0,0 +1,147 @@
+"""
+Persistent disease -> department cache in front of the LLM calls.
+
+Every /detect_dept miss costs three dept_generate calls and one
+dept_finalize call to the remote model, while the answer for a given disease
+barely changes. Entries are kept in SQLite so they survive restarts and are
+shared by all workers on the instance.
+
+Usage:
+    python dept_cache.py warm --csv dataset/data_sample.csv
+    python dept_cache.py invalidate [--disease "panic disorder"]
+    python dept_cache.py stats
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "dept_cache.db"
+DEFAULT_TTL = 30 * 24 * 3600  # 30 days
+
+
+def normalize_disease(disease):
+    return " ".join(str(disease).lower().split())
+
+
+class DepartmentCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        """
+        path: SQLite database file
+        ttl: seconds an entry stays valid, 0 disables expiry
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS disease_department ("
+            " disease TEXT PRIMARY KEY,"
+            " department TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, disease, record=True):
+        """Cached department or None; record=False leaves the hit/miss counters alone."""
+        key = normalize_disease(disease)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT department, updated_at FROM disease_department WHERE disease = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+                self.misses += record
+                return None
+            self.hits += record
+            return row[0]
+
+    def set(self, disease, department):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO disease_department (disease, department, updated_at) VALUES (?, ?, ?)",
+                (normalize_disease(disease), department, time.time())
+            )
+            self._conn.commit()
+
+    def invalidate(self, disease=None):
+        """Drop one disease, or every entry when disease is None. Returns the number of rows removed."""
+        with self._lock:
+            if disease is None:
+                cursor = self._conn.execute("DELETE FROM disease_department")
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM disease_department WHERE disease = ?", (normalize_disease(disease),)
+                )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM disease_department").fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "ttl": self.ttl,
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def warm(cache, csv_path, limit=None):
+    """Resolve and cache the department of every disease label in csv_path that is not cached yet."""
+    import pandas as pd
+    from dept import resolve_department
+
+    diseases = sorted(pd.read_csv(csv_path)['response'].dropna().astype(str).unique())
+    # Not recorded: resolve_department looks each pending disease up again
+    pending = [disease for disease in diseases if cache.get(disease, record=False) is None]
+    if limit:
+        pending = pending[:limit]
+    print(f"[WARM] {len(diseases)} diseases in {csv_path}, {len(pending)} not cached", flush=True)
+
+    start = time.perf_counter()
+    for i, disease in enumerate(pending, start=1):
+        department = resolve_department(disease, cache=cache)
+        print(f"[WARM] {i}/{len(pending)} {disease} -> {department}", flush=True)
+    print(f"[WARM] Done in {time.perf_counter() - start:.1f}s. Cache size: {len(cache)}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the persistent disease -> department cache")
+    parser.add_argument("--path", default=os.getenv("DEPT_CACHE_PATH", DEFAULT_CACHE_PATH))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    warm_parser = subparsers.add_parser("warm", help="Pre-populate the cache from a CSV's disease labels")
+    warm_parser.add_argument("--csv", default="dataset/data_sample.csv")
+    warm_parser.add_argument("--limit", type=int, default=None)
+
+    invalidate_parser = subparsers.add_parser("invalidate", help="Drop one disease or the whole cache")
+    invalidate_parser.add_argument("--disease", default=None)
+
+    subparsers.add_parser("stats", help="Print cache size")
+    args = parser.parse_args()
+
+    cache = DepartmentCache(args.path, ttl=float(os.getenv("DEPT_CACHE_TTL", str(DEFAULT_TTL))))
+    if args.command == "warm":
+        warm(cache, args.csv, args.limit)
+    elif args.command == "invalidate":
+        print(f"[CACHE] Removed {cache.invalidate(args.disease)} entries")
+    else:
+        print(cache.stats())
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Quantized ONNX (int8) CPU embedding backend for all-MiniLM-L6-v2.
+
+The model is exported once from the cached Sentence Transformer to ONNX and
+dynamically quantized to int8. At runtime it only needs onnxruntime and
+tokenizers, so the service does not have to import PyTorch. Select it with
+EMBED_BACKEND=onnx (default: torch).
+
+Usage:
+    python embed_backend.py export               # models/all-MiniLM-L6-v2 -> models/all-MiniLM-L6-v2-onnx-int8
+    python embed_backend.py parity               # compare ONNX int8 and PyTorch embeddings
+    python embed_backend.py bench                # latency / throughput / memory of both backends
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ONNX_SUFFIX = "-onnx-int8"
+FP32_FILE = "model.onnx"
+INT8_FILE = "model_int8.onnx"
+CONFIG_FILE = "embed_config.json"
+
+SAMPLE_QUERIES = [
+    "fever, cough",
+    "headache, nausea, dizziness",
+    "anxiety and nervousness, shortness of breath, palpitations",
+    "sharp abdominal pain, vomiting, diarrhea",
+    "skin rash, itching of skin, skin lesion",
+    "back pain, low back pain, leg pain",
+    "sore throat, nasal congestion, fever, ache all over",
+    "depression, insomnia, depressive or psychotic symptoms",
+]
+
+
+def onnx_model_dir(model_name, model_dir="models"):
+    return os.path.join(model_dir, model_name + ONNX_SUFFIX)
+
+
+class OnnxEmbedder:
+    """
+    Drop-in replacement for the parts of SentenceTransformer the service uses:
+    encode() with mean pooling and (like all-MiniLM-L6-v2) L2 normalization.
+    """
+
+    def __init__(self, model_dir, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE), encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.model_id = self.config["model_id"]
+        self.normalize = self.config.get("normalize", True)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.config.get("max_seq_length", 256))
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, INT8_FILE), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self):
+        return self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        batches = []
+        for i in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[i:i + batch_size])
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+            mask = feeds["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+def export_onnx(source_dir, out_dir, model_name, opset=14):
+    """Export the cached Sentence Transformer's encoder to ONNX and quantize it to int8."""
+    import inspect
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    model = AutoModel.from_pretrained(source_dir)
+    model.eval()
+    tokenizer = AutoTokenizer.from_pretrained(source_dir)
+
+    dummy = tokenizer(SAMPLE_QUERIES[:2], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    class Encoder(torch.nn.Module):
+        # Keyword-only call into the HF model; its positional argument order varies between versions
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            return self.inner(**dict(zip(input_names, inputs))).last_hidden_state
+
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        export_kwargs["dynamo"] = False
+
+    fp32_path = os.path.join(out_dir, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            Encoder(model),
+            tuple(dummy[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **export_kwargs,
+        )
+    quantize_dynamic(fp32_path, os.path.join(out_dir, INT8_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    tokenizer.save_pretrained(out_dir)
+
+    max_seq_length = 256
+    st_config = os.path.join(source_dir, "sentence_bert_config.json")
+    if os.path.exists(st_config):
+        with open(st_config, encoding="utf-8") as f:
+            max_seq_length = json.load(f).get("max_seq_length", max_seq_length)
+    normalize = True
+    modules_file = os.path.join(source_dir, "modules.json")
+    if os.path.exists(modules_file):
+        with open(modules_file, encoding="utf-8") as f:
+            normalize = any(m.get("type", "").endswith("Normalize") for m in json.load(f))
+
+    with open(os.path.join(out_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_id": f"{model_name}:onnx-int8",
+            "source": model_name,
+            "max_seq_length": max_seq_length,
+            "normalize": normalize,
+        }, f, indent=2)
+    print(f"[ONNX] Exported and quantized {source_dir} -> {out_dir} in {time.perf_counter() - start:.1f}s", flush=True)
+
+
+def load_onnx_model(model_name, model_dir="models"):
+    """Open the int8 ONNX model, exporting it from the cached PyTorch model on first use."""
+    out_dir = onnx_model_dir(model_name, model_dir)
+    if not os.path.exists(os.path.join(out_dir, INT8_FILE)):
+        from embed_data import load_embed_model
+        load_embed_model(model_name, model_dir, backend="torch")  # make sure the source model is cached
+        export_onnx(os.path.join(model_dir, model_name), out_dir, model_name)
+    threads = int(os.getenv("ONNX_THREADS", "0")) or None
+    print(f"[MODEL] Loading ONNX int8 model from {out_dir}", flush=True)
+    return OnnxEmbedder(out_dir, threads=threads)
+
+
+def parity(model_name, model_dir="models", corpus_csv="dataset/data_sample.csv", min_cosine=0.98):
+    """Compare int8 ONNX embeddings with the PyTorch ones on sample queries and corpus rows."""
+    import pandas as pd
+    from embed_data import load_embed_model
+
+    torch_model = load_embed_model(model_name, model_dir, backend="torch")
+    onnx_model = load_onnx_model(model_name, model_dir)
+
+    corpus = pd.read_csv(corpus_csv)['query'].astype(str).tolist() if os.path.exists(corpus_csv) else []
+    texts = SAMPLE_QUERIES + corpus
+    reference = torch_model.encode(texts, show_progress_bar=False)
+    candidate = onnx_model.encode(texts)
+    cosine = (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1))
+
+    report = {"texts": len(texts), "min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean())}
+    if corpus:
+        # Do the sample queries retrieve the same top-5 corpus rows?
+        k = min(5, len(corpus))
+        q_ref, c_ref = reference[:len(SAMPLE_QUERIES)], reference[len(SAMPLE_QUERIES):]
+        q_new, c_new = candidate[:len(SAMPLE_QUERIES)], candidate[len(SAMPLE_QUERIES):]
+        top_ref = np.argsort(-q_ref @ c_ref.T, axis=1)[:, :k]
+        top_new = np.argsort(-q_new @ c_new.T, axis=1)[:, :k]
+        overlap = [len(set(a) & set(b)) / k for a, b in zip(top_ref, top_new)]
+        report["top5_overlap"] = float(np.mean(overlap))
+    report["passed"] = report["min_cosine"] >= min_cosine
+    print(json.dumps(report, indent=2))
+    return report
+
+
+def _bench_backend(backend, model_name, model_dir, queries, batch_texts):
+    """Runs in a fresh process so memory numbers are not mixed between backends."""
+    from embed_data import load_embed_model
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    model = load_embed_model(model_name, model_dir, backend=backend)
+    load_seconds = time.perf_counter() - start
+    model.encode(queries[0])  # warm-up
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        model.encode(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    start = time.perf_counter()
+    model.encode(batch_texts, batch_size=64)
+    throughput = len(batch_texts) / (time.perf_counter() - start)
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+        "throughput_per_sec": round(throughput, 1),
+        # ru_maxrss is reported in KiB on Linux
+        "max_rss_mb": round(rss_after / 1024, 1),
+        "model_rss_mb": round((rss_after - rss_before) / 1024, 1),
+    }
+
+
+def bench(model_name, model_dir="models", backend=None, n=200, batch=512):
+    queries = [SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)] + f", case {i}" for i in range(n)]
+    batch_texts = [SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)] for i in range(batch)]
+    if backend:
+        print(json.dumps(_bench_backend(backend, model_name, model_dir, queries, batch_texts)))
+        return
+
+    results = []
+    for name in ("torch", "onnx"):
+        output = subprocess.run(
+            [sys.executable, __file__, "bench", "--backend", name, "--model", model_name,
+             "--model-dir", model_dir, "-n", str(n), "--batch", str(batch)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    for result in results:
+        print(f"{result['backend']:<6} load={result['load_seconds']:7.2f}s  "
+              f"p50={result['p50_ms']:7.2f}ms  p99={result['p99_ms']:7.2f}ms  "
+              f"throughput={result['throughput_per_sec']:8.1f}/s  max_rss={result['max_rss_mb']:7.1f}MB")
+
+
+def main():
+    from embed_data import EMBED_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="ONNX int8 embedding backend tools")
+    parser.add_argument("command", choices=["export", "parity", "bench"])
+    parser.add_argument("--model", default=EMBED_MODEL_NAME)
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--backend", choices=["torch", "onnx"], help="bench: run a single backend")
+    parser.add_argument("-n", type=int, default=200, help="bench: single-query iterations")
+    parser.add_argument("--batch", type=int, default=512, help="bench: texts in the throughput batch")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from embed_data import load_embed_model
+        load_embed_model(args.model, args.model_dir, backend="torch")  # make sure the source model is cached
+        export_onnx(os.path.join(args.model_dir, args.model), onnx_model_dir(args.model, args.model_dir), args.model)
+    elif args.command == "parity":
+        sys.exit(0 if parity(args.model, args.model_dir)["passed"] else 1)
+    else:
+        bench(args.model, args.model_dir, args.backend, args.n, args.batch)
+
+
+if __name__ == "__main__":
+    main()
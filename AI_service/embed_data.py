@@ -1,26 +1,168 @@
-from datasets import load_dataset
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-import chromadb
-
-
-
-def embed_data(df, model_embed, collection):
-
-    # Keep a mapping from ID → disease name
-    for row in df.iterrows():
-        
-        # print(test)
-        # print(row[1]['response'])
-        emb = model_embed.encode(row[1]['query']).tolist()
-        collection.add(
-            ids=[str(row[1]['id'])], 
-            embeddings=[emb], 
-            documents=[row[1]['query']],   
-            metadatas=[{             
-                "disease": row[1]['response'],
-                "symptoms": row[1]['query']
-            }]
+import hashlib
+import os
+import time
+
+
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+# "torch" runs the Sentence Transformer with PyTorch, "onnx" the int8 ONNX export (see embed_backend.py)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+
+# Rows encoded per model_embed.encode call and written per collection.upsert call.
+# Kept well below Chroma's max batch size (~5k rows for the SQLite backend).
+DEFAULT_BATCH_SIZE = 512
+
+# Page size used when reading ids/metadata back out of the collection
+SYNC_PAGE_SIZE = 5000
+
+
+def load_embed_model(model_name=EMBED_MODEL_NAME, model_dir="models", backend=None):
+    """
+    Load the Sentence Transformer model from model_dir, downloading and
+    caching it there on first use. backend (default EMBED_BACKEND) selects
+    PyTorch or the quantized ONNX runtime.
+    """
+    if (backend or EMBED_BACKEND) == "onnx":
+        from embed_backend import load_onnx_model
+        return load_onnx_model(model_name, model_dir)
+
+    from sentence_transformers import SentenceTransformer
+    embed_model_path = os.path.join(model_dir, model_name)
+    os.makedirs(model_dir, exist_ok=True)
+
+    if os.path.exists(embed_model_path):
+        print(f"[MODEL] Loading Sentence Transformer model from local path: {embed_model_path}", flush=True)
+        model_embed = SentenceTransformer(embed_model_path)
+    else:
+        print(f"[MODEL] Downloading and caching Sentence Transformer model to: {embed_model_path}", flush=True)
+        model_embed = SentenceTransformer(model_name)
+        model_embed.save(embed_model_path)
+    # Identifies the encoder for the on-disk embedding cache (ONNX models carry their own)
+    model_embed.model_id = model_name
+    print("[MODEL] Sentence Transformer Model is ready for use.", flush=True)
+    return model_embed
+
+
+def row_hash(row_id, query, response):
+    """Content hash of one corpus row, stored as the content_hash metadata field."""
+    payload = "\x1f".join((str(row_id), str(query), str(response)))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def open_disk_cache(model_embed, cache_dir):
+    """EmbeddingDiskCache for this encoder under cache_dir, or None when cache_dir is empty."""
+    if not cache_dir:
+        return None
+    from embedding_disk_cache import EmbeddingDiskCache
+    return EmbeddingDiskCache(cache_dir, getattr(model_embed, "model_id", type(model_embed).__name__))
+
+
+def encode_cached(model_embed, texts, disk_cache=None):
+    """Encode texts, reusing (and filling) disk_cache when given."""
+    if disk_cache is None:
+        return model_embed.encode(texts, show_progress_bar=False).tolist()
+    keys, vectors = disk_cache.lookup(texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        encoded = model_embed.encode([texts[i] for i in missing], show_progress_bar=False)
+        disk_cache.add(keys[missing], encoded)
+        for i, vector in zip(missing, encoded):
+            vectors[i] = vector
+    return [vector.tolist() for vector in vectors]
+
+
+def embed_data(df, model_embed, collection, batch_size=DEFAULT_BATCH_SIZE, disk_cache=None):
+    """
+    Bulk-ingest the (id, query, response) rows of df into the collection.
+    Rows are encoded in batches of batch_size and each batch is written with a
+    single upsert, so re-running over the same rows is idempotent.
+    With disk_cache (see embedding_disk_cache.py) only texts it has not seen
+    are encoded. Returns ingestion stats (rows, seconds, rows_per_sec).
+    """
+    total = len(df)
+    start = time.perf_counter()
+
+    for i in range(0, total, batch_size):
+        batch_df = df.iloc[i:i + batch_size]
+        ids = [str(row_id) for row_id in batch_df['id']]
+        queries = batch_df['query'].astype(str).tolist()
+        diseases = batch_df['response'].astype(str).tolist()
+
+        embeddings = encode_cached(model_embed, queries, disk_cache)
+        collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=queries,
+            metadatas=[
+                {"disease": disease, "symptoms": query, "content_hash": row_hash(row_id, query, disease)}
+                for row_id, disease, query in zip(ids, diseases, queries)
+            ]
         )
 
-    # client.delete_collection(name="disease_symptoms")
\ No newline at end of file
+        done = i + len(batch_df)
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        print(f"[EMBED] Batch {i // batch_size + 1}/{(total - 1) // batch_size + 1} "
+              f"({done}/{total} rows, {rate:.1f} rows/sec)", flush=True)
+
+    if disk_cache is not None:
+        disk_cache.flush()
+    elapsed = time.perf_counter() - start
+    stats = {
+        "rows": total,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    if disk_cache is not None:
+        stats["disk_cache"] = disk_cache.stats()
+    print(f"[EMBED] Ingested {stats['rows']} rows in {stats['seconds']}s "
+          f"({stats['rows_per_sec']} rows/sec)", flush=True)
+    return stats
+
+
+def sync_data(df, model_embed, collection, batch_size=DEFAULT_BATCH_SIZE, disk_cache=None):
+    """
+    Bring the collection in line with df without a full rebuild.
+    Rows whose content_hash is new or changed are re-embedded, rows that are no
+    longer in df are deleted and everything else is left untouched.
+    Returns sync stats (added, updated, deleted, unchanged, seconds).
+    """
+    start = time.perf_counter()
+
+    existing = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=SYNC_PAGE_SIZE, offset=offset)
+        for row_id, metadata in zip(page['ids'], page['metadatas']):
+            existing[row_id] = (metadata or {}).get("content_hash")
+        if len(page['ids']) < SYNC_PAGE_SIZE:
+            break
+        offset += SYNC_PAGE_SIZE
+
+    ids = df['id'].astype(str)
+    hashes = [
+        row_hash(row_id, query, response)
+        for row_id, query, response in zip(ids, df['query'].astype(str), df['response'].astype(str))
+    ]
+    is_new = [row_id not in existing for row_id in ids]
+    is_changed = [
+        not new and existing[row_id] != content_hash
+        for row_id, content_hash, new in zip(ids, hashes, is_new)
+    ]
+    stale = sorted(existing.keys() - set(ids))
+
+    dirty = [new or changed for new, changed in zip(is_new, is_changed)]
+    if any(dirty):
+        embed_data(df[dirty], model_embed, collection, batch_size=batch_size, disk_cache=disk_cache)
+    for i in range(0, len(stale), batch_size):
+        collection.delete(ids=stale[i:i + batch_size])
+
+    stats = {
+        "added": sum(is_new),
+        "updated": sum(is_changed),
+        "deleted": len(stale),
+        "unchanged": len(df) - sum(dirty),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    print(f"[SYNC] added={stats['added']} updated={stats['updated']} deleted={stats['deleted']} "
+          f"unchanged={stats['unchanged']} in {stats['seconds']}s", flush=True)
+    return stats
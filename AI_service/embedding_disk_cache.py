@@ -0,0 +1,145 @@
+"""
+Content-addressed on-disk embedding cache consulted by embed_data.
+
+Each entry is keyed by sha256(model id + text), truncated to 16 bytes, so a
+rebuild of the collection (new Chroma version, another VECTOR_BACKEND, new
+HNSW settings) reuses the vectors of every unchanged text instead of
+re-encoding it. The model id includes the backend ("all-MiniLM-L6-v2" vs
+"all-MiniLM-L6-v2:onnx-int8"), and every model id gets its own directory, so
+vectors from different encoders never mix.
+
+Storage is a list of immutable segments, each a pair of .npy files (sorted
+keys as S16 and float32 vectors in the same order) opened with mmap, so
+looking up a batch is a searchsorted per segment and nothing is loaded
+eagerly. New vectors are buffered and written as one segment by flush();
+once there are more than MAX_SEGMENTS segments they are merged into one.
+
+Usage:
+    python embedding_disk_cache.py stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = "embedding_cache"
+MAX_SEGMENTS = 8
+KEY_BYTES = 16
+
+
+def text_key(model_id, text):
+    return hashlib.sha256(f"{model_id}\x1f{text}".encode("utf-8")).digest()[:KEY_BYTES]
+
+
+class EmbeddingDiskCache:
+    def __init__(self, root, model_id):
+        self.model_id = model_id
+        self.path = os.path.join(root, re.sub(r"[^A-Za-z0-9._-]+", "_", model_id))
+        os.makedirs(self.path, exist_ok=True)
+        self.segments = []
+        self.pending_keys, self.pending_vectors = [], []
+        self.hits = self.misses = 0
+        self._open_segments()
+
+    def _segment_names(self):
+        return sorted(name[:-len(".keys.npy")] for name in os.listdir(self.path) if name.endswith(".keys.npy"))
+
+    def _open_segments(self):
+        self.segments = [
+            (np.load(os.path.join(self.path, f"{name}.keys.npy"), mmap_mode="r"),
+             np.load(os.path.join(self.path, f"{name}.vectors.npy"), mmap_mode="r"))
+            for name in self._segment_names()
+        ]
+
+    def __len__(self):
+        return sum(len(keys) for keys, _ in self.segments) + len(self.pending_keys)
+
+    def lookup(self, texts):
+        """Returns (keys, vectors): vectors[i] is the cached embedding of texts[i] or None."""
+        keys = np.array([text_key(self.model_id, text) for text in texts], dtype=f"S{KEY_BYTES}")
+        vectors = [None] * len(texts)
+        for segment_keys, segment_vectors in self.segments:
+            positions = np.searchsorted(segment_keys, keys)
+            positions = np.minimum(positions, len(segment_keys) - 1)
+            for i in np.flatnonzero(segment_keys[positions] == keys):
+                if vectors[i] is None:
+                    vectors[i] = np.asarray(segment_vectors[positions[i]])
+        found = sum(vector is not None for vector in vectors)
+        self.hits += found
+        self.misses += len(texts) - found
+        return keys, vectors
+
+    def add(self, keys, vectors):
+        self.pending_keys.extend(keys)
+        self.pending_vectors.extend(np.asarray(vectors, dtype=np.float32))
+
+    def _write_segment(self, name, keys, vectors):
+        order = np.argsort(keys, kind="stable")
+        # Vectors first: a segment only becomes visible once its keys file exists
+        for suffix, array in ((".vectors.npy", vectors[order]), (".keys.npy", keys[order])):
+            tmp_path = os.path.join(self.path, f"{name}{suffix}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, os.path.join(self.path, name + suffix))
+
+    def flush(self):
+        """Write buffered vectors as a new segment, merging segments when there are too many."""
+        if not self.pending_keys:
+            return
+        keys = np.array(self.pending_keys, dtype=f"S{KEY_BYTES}")
+        keys, unique = np.unique(keys, return_index=True)
+        vectors = np.stack(self.pending_vectors)[unique]
+        self._write_segment(time.strftime("%Y%m%d%H%M%S") + f"-{time.perf_counter_ns() % 10**9:09d}", keys, vectors)
+        self.pending_keys, self.pending_vectors = [], []
+        if len(self._segment_names()) > MAX_SEGMENTS:
+            self.compact()
+        else:
+            self._open_segments()
+
+    def compact(self):
+        """Merge every segment into one."""
+        names = self._segment_names()
+        self._open_segments()
+        keys = np.concatenate([np.asarray(k) for k, _ in self.segments])
+        vectors = np.concatenate([np.asarray(v) for _, v in self.segments])
+        keys, unique = np.unique(keys, return_index=True)
+        self.segments = []
+        self._write_segment(names[-1] + "-merged", keys, vectors[unique])
+        for name in names:
+            for suffix in (".keys.npy", ".vectors.npy"):
+                os.remove(os.path.join(self.path, name + suffix))
+        self._open_segments()
+
+    def stats(self):
+        return {
+            "model_id": self.model_id,
+            "entries": len(self),
+            "segments": len(self.segments),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes": sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path)),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or compact the on-disk embedding cache")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("--dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dir):
+        print(f"No embedding cache at {args.dir}")
+        return
+    for model_dir in sorted(os.listdir(args.dir)):
+        cache = EmbeddingDiskCache(args.dir, model_dir)
+        if args.command == "compact" and len(cache.segments) > 1:
+            cache.compact()
+        print(json.dumps(cache.stats()))
+
+
+if __name__ == "__main__":
+    main()
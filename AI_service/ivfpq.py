@@ -0,0 +1,269 @@
+"""
+IVF-PQ approximate index over a NumPy vector store (VECTOR_BACKEND=ivfpq).
+
+Sized for the full merged corpus (~493K rows), where float32 vectors plus an
+HNSW graph do not fit a small instance:
+  - a coarse k-means quantizer splits the vectors into nlist inverted lists
+  - each vector's residual to its list centroid is product-quantized into
+    M one-byte codes (M subspaces x 256 centroids)
+  - a query scans the nprobe closest lists with per-subspace lookup tables,
+    keeps a short list of the best approximate scores and re-ranks it
+    exactly against the float16 embeddings of the mmap'd NumpyVectorStore
+
+Only the codes, row ids and codebooks stay resident; with M=48 and 384-dim
+embeddings that is 52 bytes per vector against 1536 for float32.
+
+Usage:
+    python ivfpq.py build --store indexes/<version>/numpy --out indexes/<version>/ivfpq
+    python ivfpq.py eval --store indexes/<version>/numpy --index indexes/<version>/ivfpq --nprobe 1 4 8 16 32
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from vector_store import NumpyVectorStore, normalize_rows, query_result, top_k
+
+INDEX_FILE = "ivfpq.npz"
+
+DEFAULT_M = 48
+DEFAULT_KSUB = 256
+DEFAULT_NPROBE = 8
+DEFAULT_RERANK = 64
+KMEANS_ITERATIONS = 20
+TRAIN_SAMPLE_ROWS = 65536
+ENCODE_CHUNK_ROWS = 16384
+
+
+def default_nlist(n_rows):
+    return max(1, min(n_rows, int(4 * np.sqrt(n_rows))))
+
+
+def assign(x, centroids):
+    """Index of the nearest (L2) centroid for every row of x, in chunks."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    labels = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), ENCODE_CHUNK_ROWS):
+        chunk = np.asarray(x[start:start + ENCODE_CHUNK_ROWS], dtype=np.float32)
+        labels[start:start + len(chunk)] = np.argmin(centroid_norms - 2.0 * chunk @ centroids.T, axis=1)
+    return labels
+
+
+def kmeans(x, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Plain Lloyd's k-means; empty clusters are re-seeded from random rows."""
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype=np.float32)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(x, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, x)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        centroids[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+    return centroids
+
+
+def build_ivfpq(store, path, nlist=None, m=DEFAULT_M, ksub=DEFAULT_KSUB, seed=0):
+    """Train and encode an IVF-PQ index for every row of a NumpyVectorStore."""
+    start = time.perf_counter()
+    vectors = store.embeddings
+    n_rows, dim = vectors.shape
+    if dim % m:
+        raise ValueError(f"Embedding dimension {dim} is not divisible by M={m}")
+    nlist = min(nlist or default_nlist(n_rows), n_rows)
+    ksub = min(ksub, n_rows)
+    dsub = dim // m
+
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(n_rows, size=min(n_rows, TRAIN_SAMPLE_ROWS), replace=False))
+    train = np.asarray(vectors[sample], dtype=np.float32)
+
+    centroids = kmeans(train, nlist, seed=seed)
+    residuals = train - centroids[assign(train, centroids)]
+    codebooks = np.stack([
+        kmeans(residuals[:, i * dsub:(i + 1) * dsub], ksub, seed=seed + i + 1) for i in range(m)
+    ])
+    print(f"[IVFPQ] Trained nlist={nlist} M={m} ksub={ksub} on {len(train)} rows "
+          f"in {time.perf_counter() - start:.1f}s", flush=True)
+
+    labels = np.empty(n_rows, dtype=np.int64)
+    codes = np.empty((n_rows, m), dtype=np.uint8)
+    for chunk_start in range(0, n_rows, ENCODE_CHUNK_ROWS):
+        chunk = np.asarray(vectors[chunk_start:chunk_start + ENCODE_CHUNK_ROWS], dtype=np.float32)
+        chunk_labels = assign(chunk, centroids)
+        chunk_residuals = chunk - centroids[chunk_labels]
+        for i in range(m):
+            codes[chunk_start:chunk_start + len(chunk), i] = assign(chunk_residuals[:, i * dsub:(i + 1) * dsub], codebooks[i])
+        labels[chunk_start:chunk_start + len(chunk)] = chunk_labels
+
+    # Lay the codes out list by list so a probe reads one contiguous slice
+    order = np.argsort(labels, kind="stable")
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(labels, minlength=nlist))
+
+    os.makedirs(path, exist_ok=True)
+    np.savez(
+        os.path.join(path, INDEX_FILE),
+        centroids=centroids.astype(np.float32),
+        codebooks=codebooks.astype(np.float32),
+        codes=codes[order],
+        row_ids=order.astype(np.int32),
+        offsets=offsets,
+    )
+    print(f"[IVFPQ] Encoded {n_rows} rows into {path} in {time.perf_counter() - start:.1f}s", flush=True)
+    return IvfPqIndex(path, store)
+
+
+class IvfPqIndex:
+    def __init__(self, path, store, nprobe=DEFAULT_NPROBE, rerank=DEFAULT_RERANK):
+        self.path = path
+        self.store = store
+        self.nprobe = nprobe
+        self.rerank = rerank
+        with np.load(os.path.join(path, INDEX_FILE)) as data:
+            self.centroids = data["centroids"]
+            self.codebooks = data["codebooks"]
+            self.codes = data["codes"]
+            self.row_ids = data["row_ids"]
+            self.offsets = data["offsets"]
+        if len(self.row_ids) != store.count():
+            raise ValueError(f"IVF-PQ index at {path} has {len(self.row_ids)} rows, store has {store.count()}")
+
+    @staticmethod
+    def exists(path):
+        return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+    def count(self):
+        return len(self.row_ids)
+
+    def memory_report(self):
+        n_rows, m = self.codes.shape
+        dim = self.centroids.shape[1]
+        resident = self.codes.nbytes + self.row_ids.nbytes + self.offsets.nbytes + self.centroids.nbytes + self.codebooks.nbytes
+        return {
+            "rows": n_rows,
+            "bytes_per_vector": m + self.row_ids.itemsize,
+            "float32_bytes_per_vector": dim * 4,
+            "compression": round(dim * 4 / (m + self.row_ids.itemsize), 1),
+            "resident_mb": round(resident / 1e6, 2),
+        }
+
+    def _candidates(self, query, nprobe):
+        """Approximate inner products for every row in the nprobe closest lists."""
+        coarse = self.centroids @ query
+        lists = np.argpartition(-coarse, nprobe - 1)[:nprobe] if nprobe < len(coarse) else np.arange(len(coarse))
+        m, ksub, dsub = self.codebooks.shape
+        # lut[i, j] = query's slice i . codebook i's centroid j
+        lut = np.einsum("md,mkd->mk", query.reshape(m, dsub), self.codebooks)
+        positions, scores = [], []
+        for list_id in lists:
+            lo, hi = self.offsets[list_id], self.offsets[list_id + 1]
+            if lo == hi:
+                continue
+            codes = self.codes[lo:hi]
+            positions.append(np.arange(lo, hi))
+            scores.append(coarse[list_id] + lut[np.arange(m), codes].sum(axis=1))
+        if not positions:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(positions), np.concatenate(scores)
+
+    def search(self, query_embeddings, n_results=5, nprobe=None, rerank=None):
+        """Approximate top-k with exact re-ranking: returns (row indices, cosine scores) per query."""
+        nprobe = nprobe or self.nprobe
+        rerank = max(rerank or self.rerank, n_results)
+        queries = normalize_rows(query_embeddings)
+        all_rows, all_scores = [], []
+        for query in queries:
+            positions, approx = self._candidates(query, nprobe)
+            if len(positions) > rerank:
+                positions = positions[np.argpartition(-approx, rerank - 1)[:rerank]]
+            rows = np.sort(self.row_ids[positions].astype(np.int64))
+            exact = np.asarray(self.store.embeddings[rows], dtype=np.float32) @ query
+            best = top_k(exact[None, :], n_results)[0]
+            all_rows.append(rows[best])
+            all_scores.append(exact[best])
+        return all_rows, all_scores
+
+    def query(self, query_embeddings, n_results=5, **kwargs):
+        """Chroma-compatible query(), same shape as NumpyVectorStore.query."""
+        rows, scores = self.search(query_embeddings, n_results)
+        return query_result(self.store, rows, scores)
+
+
+def sample_queries(store, n=200, seed=0):
+    """Partial symptom lists (first half of a random row's symptoms) as realistic queries."""
+    from symptom_text import split_symptoms
+
+    rng = np.random.default_rng(seed)
+    queries = []
+    for row in rng.choice(store.count(), size=min(n, store.count()), replace=False):
+        symptoms = split_symptoms(store.symptoms[row])
+        if symptoms:
+            queries.append(", ".join(symptoms[:max(1, len(symptoms) // 2)]))
+    return queries
+
+
+def evaluate(index, query_embeddings, k=5, nprobes=(1, 4, 8, 16, 32)):
+    """Recall@k and per-query latency of the index against exact search on the same store."""
+    def timed(search):
+        latencies, results = [], []
+        for query in query_embeddings:
+            start = time.perf_counter()
+            rows, _ = search(query[None, :])
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append(set(int(r) for r in rows[0]))
+        return results, latencies
+
+    exact, exact_ms = timed(lambda q: index.store.search(q, k))
+    report = {"queries": len(query_embeddings), "k": k, "memory": index.memory_report(),
+              "exact": {"p50_ms": round(float(np.percentile(exact_ms, 50)), 3),
+                        "p95_ms": round(float(np.percentile(exact_ms, 95)), 3)},
+              "ivfpq": []}
+    for nprobe in nprobes:
+        approx, approx_ms = timed(lambda q: index.search(q, k, nprobe=nprobe))
+        recall = np.mean([len(a & e) / max(1, len(e)) for a, e in zip(approx, exact)])
+        report["ivfpq"].append({
+            "nprobe": nprobe,
+            f"recall@{k}": round(float(recall), 4),
+            "p50_ms": round(float(np.percentile(approx_ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(approx_ms, 95)), 3),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or evaluate an IVF-PQ index over a NumPy vector store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build")
+    build.add_argument("--store", required=True, help="NumpyVectorStore directory")
+    build.add_argument("--out", required=True)
+    build.add_argument("--nlist", type=int, default=None)
+    build.add_argument("--m", type=int, default=DEFAULT_M)
+
+    evaluate_cmd = sub.add_parser("eval")
+    evaluate_cmd.add_argument("--store", required=True)
+    evaluate_cmd.add_argument("--index", required=True)
+    evaluate_cmd.add_argument("--queries", type=int, default=200)
+    evaluate_cmd.add_argument("--k", type=int, default=5)
+    evaluate_cmd.add_argument("--rerank", type=int, default=DEFAULT_RERANK)
+    evaluate_cmd.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    store = NumpyVectorStore(args.store)
+    if args.command == "build":
+        index = build_ivfpq(store, args.out, nlist=args.nlist, m=args.m)
+        print(json.dumps(index.memory_report(), indent=2))
+    else:
+        from embed_data import load_embed_model
+        index = IvfPqIndex(args.index, store, rerank=args.rerank)
+        queries = load_embed_model().encode(sample_queries(store, args.queries))
+        print(json.dumps(evaluate(index, queries, k=args.k, nprobes=args.nprobe), indent=2))
+
+
+if __name__ == "__main__":
+    main()
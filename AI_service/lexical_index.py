@@ -0,0 +1,170 @@
+"""
+BM25 lexical retrieval over symptom phrases.
+
+Each disease is one document whose terms are the canonical symptom phrases
+of its corpus rows (tf = number of rows mentioning the phrase). Queries are
+tokenized into phrases: every comma-separated part is taken whole when it is
+a known phrase, otherwise split into the longest known phrases word by word.
+A query made only of known phrases is "exact-vocabulary" and can be answered
+here without calling the embedding model; otherwise its BM25 ranking can be
+fused with the vector ranking by reciprocal-rank fusion (rrf_fuse).
+
+The vocabulary is every phrase in the corpus plus dataset/symptoms.csv.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+from symptom_text import split_symptoms
+
+SYMPTOMS_CSV = "dataset/symptoms.csv"
+INDEX_FILE = "lexical.json"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+PAGE_SIZE = 5000
+
+# Column-name artifacts such as "regurgitation.1" in merged_disease_symptoms.json
+_DUPLICATE_SUFFIX = re.compile(r"\.\d+$")
+# Words allowed between phrases without making a query non-exact
+FILLER_WORDS = {"and", "or", "with", "also", "plus"}
+
+
+def canonical_phrase(phrase):
+    return _DUPLICATE_SUFFIX.sub("", phrase).strip()
+
+
+def load_vocabulary(path=SYMPTOMS_CSV):
+    if not os.path.exists(path):
+        return []
+    import pandas as pd
+    return [canonical_phrase(p) for p in split_symptoms("\n".join(pd.read_csv(path)['symptom'].dropna().astype(str)))]
+
+
+def rows_from_collection(collection):
+    """(disease, symptoms) for every row of a Chroma collection or a NumPy-backed store."""
+    if hasattr(collection, "diseases") and hasattr(collection, "symptoms"):
+        return list(zip(collection.diseases, collection.symptoms))
+    if hasattr(collection, "store"):
+        return list(zip(collection.store.diseases, collection.store.symptoms))
+    rows, offset = [], 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=PAGE_SIZE, offset=offset)
+        rows.extend((m["disease"], m.get("symptoms", "")) for m in page['metadatas'])
+        if len(page['ids']) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def rrf_fuse(rankings, n_results=5, k=RRF_K):
+    """
+    Reciprocal-rank fusion of several [{disease: percentage}, ...] rankings.
+    BM25 and cosine percentages are on different scales, so the reported
+    percentage is the fused RRF score itself, relative to a disease ranked
+    first in every ranking (100).
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, disease_dict in enumerate(ranking):
+            for disease in disease_dict:
+                fused[disease] += 1.0 / (k + rank + 1)
+    best_possible = len(rankings) / (k + 1)
+    order = sorted(fused, key=lambda disease: (-fused[disease], disease))
+    return [{disease: fused[disease] / best_possible * 100} for disease in order[:n_results]]
+
+
+class LexicalIndex:
+    def __init__(self, diseases, postings, doc_lengths, vocabulary):
+        self.diseases = diseases
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+        self.vocabulary = set(vocabulary) | set(postings)
+        self.phrases = {tuple(phrase.split()) for phrase in self.vocabulary}
+        self.max_phrase_words = max((len(words) for words in self.phrases), default=0)
+        n_docs = len(diseases)
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in postings.items()
+        }
+
+    @classmethod
+    def from_rows(cls, rows, vocabulary=()):
+        """Build from (disease, symptom list text) rows."""
+        term_counts = defaultdict(Counter)
+        for disease, symptoms in rows:
+            term_counts[disease].update(set(canonical_phrase(p) for p in split_symptoms(symptoms)))
+        diseases = sorted(term_counts)
+        postings = defaultdict(list)
+        for doc, disease in enumerate(diseases):
+            for term, tf in sorted(term_counts[disease].items()):
+                postings[term].append((doc, tf))
+        doc_lengths = [sum(term_counts[disease].values()) for disease in diseases]
+        return cls(diseases, dict(postings), doc_lengths, vocabulary)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, INDEX_FILE), encoding="utf-8") as f:
+            data = json.load(f)
+        postings = {term: [tuple(p) for p in docs] for term, docs in data["postings"].items()}
+        return cls(data["diseases"], postings, data["doc_lengths"], data["vocabulary"])
+
+    @staticmethod
+    def exists(path):
+        return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "diseases": self.diseases,
+                "doc_lengths": self.doc_lengths,
+                "vocabulary": sorted(self.vocabulary),
+                "postings": self.postings,
+            }, f, separators=(",", ":"))
+
+    def tokenize(self, text):
+        """
+        Symptom phrases of a query, plus whether the whole query was covered
+        by known phrases (filler words aside).
+        """
+        terms, exact = [], True
+        for part in split_symptoms(text):
+            part = canonical_phrase(part)
+            if part in self.vocabulary:
+                terms.append(part)
+                continue
+            words = part.split()
+            i = 0
+            while i < len(words):
+                for n in range(min(self.max_phrase_words, len(words) - i), 0, -1):
+                    if tuple(words[i:i + n]) in self.phrases:
+                        terms.append(" ".join(words[i:i + n]))
+                        i += n
+                        break
+                else:
+                    if words[i] not in FILLER_WORDS:
+                        exact = False
+                    i += 1
+        return terms, exact and bool(terms)
+
+    def search_terms(self, terms, n_results=5):
+        """BM25 ranking as [{disease: percentage}, ...]; percentage is the score over its upper bound."""
+        scores = defaultdict(float)
+        best_possible = 0.0
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            best_possible += idf * (BM25_K1 + 1)
+            for doc, tf in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc] / self.avg_length)
+                scores[doc] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:n_results]
+        return [{self.diseases[doc]: score / best_possible * 100} for doc, score in ranked]
+
+    def search(self, text, n_results=5):
+        return self.search_terms(self.tokenize(text)[0], n_results)
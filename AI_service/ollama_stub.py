@@ -0,0 +1,80 @@
+"""
+Minimal Ollama-compatible /api/chat server for testing the department pipeline
+without the remote model.
+
+Answers come from the static department_mapping table after a fixed
+artificial latency (STUB_LATENCY seconds, default 1.0), so wall-clock
+measurements of /detect_dept reflect how many LLM round-trips are serialized.
+
+Usage:
+    STUB_LATENCY=1.0 uvicorn ollama_stub:app --port 11434
+    OLLAMA_HOST=http://localhost:11434 uvicorn ai:app --port 8000
+"""
+import asyncio
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from department_mapping import get_department_for_disease
+
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "1.0"))
+
+app = FastAPI()
+stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+def answer(prompt):
+    # Batched classification prompt: JSON object of disease -> department
+    batch = re.search(r"Diseases:\n(.*?)\nAnswer with a JSON object", prompt, re.S)
+    if batch:
+        diseases = [line[2:].strip() for line in batch.group(1).splitlines() if line.startswith("- ")]
+        return json.dumps({disease: get_department_for_disease(disease) for disease in diseases})
+    # dept_finalize prompt: pick the first department of the list
+    finalize = re.search(r"list of medical departments: (.*?)\.\s", prompt, re.S)
+    if finalize:
+        return finalize.group(1).split(",")[0].strip()
+    # dept_generate prompt
+    disease = re.search(r"the disease is: (.*?)\. Which department", prompt, re.S)
+    return get_department_for_disease(disease.group(1) if disease else prompt)
+
+
+def message(model, content, done):
+    return {
+        "model": model,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": {"role": "assistant", "content": content},
+        "done": done,
+    }
+
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(STUB_LATENCY)
+    finally:
+        stats["in_flight"] -= 1
+
+    model = body.get("model", "")
+    content = answer(body["messages"][-1]["content"])
+
+    if not body.get("stream", True):
+        return message(model, content, True)
+
+    async def stream():
+        yield json.dumps(message(model, content, False)) + "\n"
+        yield json.dumps(message(model, "", True)) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
@@ -0,0 +1,166 @@
+"""
+Sharded multi-process exact search (VECTOR_BACKEND=sharded).
+
+The NumPy vector store is split into N contiguous shards at build time
+(build_index.py --shards N), each a NumpyVectorStore of its own. Queries are
+scattered to a pool of worker processes, each scanning one shard outside the
+GIL, and the per-shard top-k lists are gathered and merged in the parent.
+Shard files are mmap'd, so workers share the page cache instead of holding
+their own copy.
+
+Usage:
+    python sharded_store.py split --store indexes/<version>/numpy --out indexes/<version>/shards --shards 4
+    python sharded_store.py bench --store indexes/<version>/numpy --shards-dir indexes/<version>/shards
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from vector_store import NumpyVectorStore, normalize_rows, query_result, top_k_merge
+
+SHARDS_FILE = "shards.json"
+
+# Shard stores opened by this worker process, by path
+_worker_stores = {}
+
+
+def _search_shard(shard_dir, queries, n_results):
+    """Runs in a worker process: top-k rows (shard-local) and scores of one shard."""
+    store = _worker_stores.get(shard_dir)
+    if store is None:
+        store = _worker_stores[shard_dir] = NumpyVectorStore(shard_dir)
+    return store.search(queries, n_results)
+
+
+def shard_dirs(path):
+    with open(os.path.join(path, SHARDS_FILE), encoding="utf-8") as f:
+        return [os.path.join(path, name) for name in json.load(f)["shards"]]
+
+
+def split_store(store, path, n_shards):
+    """
+    Write store as n_shards contiguous NumpyVectorStores under path. n_shards
+    is clamped to the row count, so no shard is empty; an empty store gets
+    one empty shard.
+    """
+    n_shards = max(1, min(n_shards, store.count()))
+    names = []
+    bounds = np.linspace(0, store.count(), n_shards + 1).astype(np.int64)
+    for i, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        name = f"shard-{i:03d}"
+        rows = range(start, stop)
+        NumpyVectorStore.write(
+            os.path.join(path, name),
+            [store.ids[r] for r in rows],
+            np.asarray(store.embeddings[start:stop], dtype=np.float32),
+            [{"disease": store.diseases[r], "symptoms": store.symptoms[r]} for r in rows],
+        )
+        names.append(name)
+    tmp_path = os.path.join(path, SHARDS_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"shards": names, "rows": store.count()}, f)
+    os.replace(tmp_path, os.path.join(path, SHARDS_FILE))
+    print(f"[SHARDS] Split {store.count()} rows into {n_shards} shards under {path}", flush=True)
+    return ShardedVectorStore(path)
+
+
+def exists(path):
+    return os.path.isfile(os.path.join(path, SHARDS_FILE))
+
+
+class ShardedVectorStore:
+    def __init__(self, path, workers=None):
+        self.path = path
+        self.shards = [NumpyVectorStore(shard_dir) for shard_dir in shard_dirs(path)]
+        self.offsets = np.cumsum([0] + [shard.count() for shard in self.shards])
+        self.ids = [row_id for shard in self.shards for row_id in shard.ids]
+        self.diseases = [disease for shard in self.shards for disease in shard.diseases]
+        self.symptoms = [symptoms for shard in self.shards for symptoms in shard.symptoms]
+        # Spawned rather than forked: the parent may already hold torch and server threads
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers or len(self.shards),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def count(self):
+        return len(self.ids)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def search(self, query_embeddings, n_results=5):
+        """Scatter to every shard, gather and merge: returns (global row indices, cosine scores)."""
+        queries = normalize_rows(query_embeddings)
+        k = min(n_results, self.count())
+        futures = [self.executor.submit(_search_shard, shard.path, queries, k) for shard in self.shards]
+        rows, scores = [], []
+        for offset, future in zip(self.offsets, futures):
+            shard_rows, shard_scores = future.result()
+            rows.append(shard_rows + offset)
+            scores.append(shard_scores)
+        rows, scores = np.concatenate(rows, axis=1), np.concatenate(scores, axis=1)
+        keep = top_k_merge(scores, rows, k)
+        return np.take_along_axis(rows, keep, axis=1), np.take_along_axis(scores, keep, axis=1)
+
+    def query(self, query_embeddings, n_results=5, **kwargs):
+        """Chroma-compatible query(), same shape as NumpyVectorStore.query."""
+        rows, scores = self.search(query_embeddings, n_results)
+        return query_result(self, rows, scores)
+
+
+def bench(store, sharded, n_queries=50, k=5, seed=0):
+    """Per-query latency of single-process exact search against the sharded store."""
+    rng = np.random.default_rng(seed)
+    queries = normalize_rows(rng.normal(size=(n_queries, store.embeddings.shape[1])))
+    sharded.search(queries[:1], k)  # warm the workers
+
+    report = {"rows": store.count(), "shards": len(sharded.shards), "queries": n_queries}
+    for name, search in (("single", store.search), ("sharded", sharded.search)):
+        latencies, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            rows, _ = search(query[None, :], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append(rows[0].tolist())
+        report[name] = {
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        }
+        report[f"{name}_results"] = results
+    report["identical"] = report.pop("single_results") == report.pop("sharded_results")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split a NumPy vector store into shards or benchmark sharded search")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    split = sub.add_parser("split")
+    split.add_argument("--store", required=True, help="NumpyVectorStore directory")
+    split.add_argument("--out", required=True)
+    split.add_argument("--shards", type=int, default=os.cpu_count())
+
+    bench_cmd = sub.add_parser("bench")
+    bench_cmd.add_argument("--store", required=True)
+    bench_cmd.add_argument("--shards-dir", required=True)
+    bench_cmd.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    store = NumpyVectorStore(args.store)
+    if args.command == "split":
+        split_store(store, args.out, args.shards).close()
+    else:
+        sharded = ShardedVectorStore(args.shards_dir)
+        try:
+            print(json.dumps(bench(store, sharded, n_queries=args.queries), indent=2))
+        finally:
+            sharded.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+In-memory symptom typeahead for the /autocomplete endpoint.
+
+Every English and Bengali symptom name (dataset/symptoms.csv plus the
+symptom vocabulary of merged_disease_symptoms.json) is inserted into a
+prefix trie once per word start, so "pain" also suggests "sharp chest pain".
+Each trie node keeps its best suggestions precomputed (most common symptoms
+first), so a lookup is one walk down the typed prefix. When no name has the
+prefix, a Levenshtein walk over the same trie finds names whose prefix is
+within one or two typos. The walk starts a couple of characters above the
+deepest node the prefix reaches exactly (where the typo is), so its cost
+does not grow with the length of what was typed.
+
+Usage:
+    python symptom_autocomplete.py          # latency report over vocabulary prefixes
+"""
+import time
+import unicodedata
+from collections import Counter
+
+from lexical_index import canonical_phrase
+
+DEFAULT_LIMIT = 8
+MAX_SUGGESTIONS = 16
+# Typos tolerated by the fuzzy fallback: 1 for short prefixes, 2 from FUZZY_LONG_PREFIX characters
+FUZZY_LONG_PREFIX = 5
+
+
+def normalize_prefix(text):
+    return " ".join(unicodedata.normalize("NFC", str(text)).lower().split())
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class SymptomAutocomplete:
+    def __init__(self, entries, popularity=None):
+        """
+        entries: (label, canonical English symptom, symptom id or None) per name;
+        popularity: canonical symptom -> weight used to order suggestions.
+        """
+        popularity = popularity or {}
+        unique = {}
+        for label, symptom, symptom_id in entries:
+            label = normalize_prefix(label)
+            if label and label not in unique:
+                unique[label] = (label, symptom, symptom_id)
+        # Most common symptom first, then shorter, then alphabetical
+        self.entries = sorted(unique.values(), key=lambda e: (-popularity.get(e[1], 0), len(e[0]), e[0]))
+
+        self.root = _Node()
+        for index, (label, _, _) in enumerate(self.entries):
+            starts = [0] + [i + 1 for i, char in enumerate(label) if char == " "]
+            for start in starts:
+                node = self.root
+                for char in label[start:]:
+                    node = node.children.setdefault(char, _Node())
+                    # Entries arrive best-first, so the first MAX_SUGGESTIONS are the node's best
+                    if len(node.top) < MAX_SUGGESTIONS and (not node.top or node.top[-1] != index):
+                        node.top.append(index)
+        self.stats = Counter()
+
+    @classmethod
+    def from_sources(cls, symptoms, json_vocabulary=(), popularity=None):
+        """symptoms: (english, bengali) per symptom id as returned by symptom_matrix.load_symptoms."""
+        entries = []
+        for symptom_id, (english, bengali) in enumerate(symptoms):
+            entries.append((english, english, symptom_id))
+            if bengali:
+                entries.append((bengali, english, symptom_id))
+        ids = {normalize_prefix(english): i for i, (english, _) in enumerate(symptoms)}
+        for symptom in json_vocabulary:
+            symptom = canonical_phrase(normalize_prefix(symptom))
+            entries.append((symptom, symptom, ids.get(symptom)))
+        return cls(entries, popularity)
+
+    def _walk(self, prefix):
+        """Nodes along the exact path of prefix, root first; stops where the trie does."""
+        path = [self.root]
+        for char in prefix:
+            node = path[-1].children.get(char)
+            if node is None:
+                break
+            path.append(node)
+        return path
+
+    def _fuzzy(self, start, prefix, max_edits):
+        """(edits, entry index) for trie paths below start within max_edits of prefix."""
+        found = {}
+        first_row = list(range(len(prefix) + 1))
+        stack = [(child, char, first_row) for char, child in start.children.items()]
+        while stack:
+            node, char, previous = stack.pop()
+            row = [previous[0] + 1]
+            for i in range(1, len(prefix) + 1):
+                row.append(min(row[i - 1] + 1, previous[i] + 1, previous[i - 1] + (prefix[i - 1] != char)))
+            if row[-1] <= max_edits:
+                for index in node.top:
+                    found[index] = min(found.get(index, max_edits + 1), row[-1])
+            if min(row) <= max_edits:
+                stack.extend((child, next_char, row) for next_char, child in node.children.items())
+        return sorted((edits, index) for index, edits in found.items())
+
+    def suggest(self, text, limit=DEFAULT_LIMIT):
+        prefix = normalize_prefix(text)
+        if not prefix:
+            return []
+        path = self._walk(prefix)
+        if len(path) == len(prefix) + 1:
+            self.stats["prefix"] += 1
+            indices = path[-1].top[:limit]
+        else:
+            max_edits = 1 if len(prefix) < FUZZY_LONG_PREFIX else 2
+            # Re-match from just above where the exact walk broke off
+            anchor = max(0, len(path) - 1 - max_edits)
+            matches = self._fuzzy(path[anchor], prefix[anchor:], max_edits)
+            self.stats["fuzzy" if matches else "miss"] += 1
+            indices = [index for _, index in matches[:limit]]
+
+        suggestions, seen = [], set()
+        for index in indices:
+            label, symptom, symptom_id = self.entries[index]
+            if (label, symptom) not in seen:
+                seen.add((label, symptom))
+                suggestions.append({"symptom": symptom, "label": label, "id": symptom_id})
+        return suggestions
+
+
+def main():
+    import json
+    import os
+    import random
+    import numpy as np
+    from symptom_matrix import load_symptoms, DEFAULT_JSON
+
+    vocabulary = []
+    if os.path.exists(DEFAULT_JSON):
+        with open(DEFAULT_JSON, encoding="utf-8") as f:
+            vocabulary = [s for symptoms in json.load(f).values() for s in symptoms]
+    index = SymptomAutocomplete.from_sources(load_symptoms(), vocabulary, Counter(canonical_phrase(normalize_prefix(s)) for s in vocabulary))
+
+    rng = random.Random(0)
+    queries = []
+    for label, _, _ in rng.sample(index.entries, min(200, len(index.entries))):
+        for n in range(1, len(label) + 1):
+            queries.append(label[:n])
+        # One typo in the middle of a longer prefix
+        if len(label) > 4:
+            i = rng.randrange(1, len(label) - 1)
+            queries.append(label[:i] + label[i + 1] + label[i] + label[i + 2:])
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.suggest(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(json.dumps({
+        "entries": len(index.entries),
+        "queries": len(queries),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+        "stats": dict(index.stats),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
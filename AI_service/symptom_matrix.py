@@ -0,0 +1,122 @@
+"""
+Packed-bit disease x symptom matrix for structured (checkbox) symptom input.
+
+Symptom IDs are row positions in dataset/symptoms.csv (0-based), so the
+frontend and Android app can send IDs instead of free text. Each disease
+from merged_disease_symptoms.json is one row of bits packed with
+np.packbits; a query is scored against every disease at once with a
+byte-popcount of (disease & query) and ranked by Jaccard similarity.
+No embedding model or vector store is involved.
+
+Usage:
+    python symptom_matrix.py                       # compile symptom_matrix.npz
+    python symptom_matrix.py --json ../merged_disease_symptoms.json --out symptom_matrix.npz
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+DEFAULT_JSON = "../merged_disease_symptoms.json"
+DEFAULT_SYMPTOMS_CSV = "dataset/symptoms.csv"
+DEFAULT_MATRIX_PATH = "symptom_matrix.npz"
+
+# Set bits per byte value
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def load_symptoms(path=DEFAULT_SYMPTOMS_CSV):
+    """(symptom, bengali name or '') per symptom ID."""
+    import pandas as pd
+    df = pd.read_csv(path)
+    names = df['symptom'].astype(str).str.strip().str.lower()
+    bengali = df.iloc[:, 1].fillna("").astype(str).str.strip()
+    return list(zip(names, bengali))
+
+
+def build_symptom_matrix(json_path=DEFAULT_JSON, symptoms_csv=DEFAULT_SYMPTOMS_CSV, out_path=DEFAULT_MATRIX_PATH):
+    from lexical_index import canonical_phrase
+
+    symptoms = load_symptoms(symptoms_csv)
+    symptom_ids = {name: i for i, (name, _) in enumerate(symptoms)}
+    with open(json_path, encoding="utf-8") as f:
+        disease_symptoms = json.load(f)
+
+    diseases = sorted(disease_symptoms)
+    matrix = np.zeros((len(diseases), len(symptoms)), dtype=bool)
+    unknown = set()
+    for row, disease in enumerate(diseases):
+        for symptom in disease_symptoms[disease]:
+            name = canonical_phrase(" ".join(symptom.lower().split()))
+            if name in symptom_ids:
+                matrix[row, symptom_ids[name]] = True
+            else:
+                unknown.add(name)
+
+    np.savez(
+        out_path,
+        diseases=np.asarray(diseases, dtype=str),
+        symptoms=np.asarray([name for name, _ in symptoms], dtype=str),
+        bengali=np.asarray([bengali for _, bengali in symptoms], dtype=str),
+        bits=np.packbits(matrix, axis=1),
+    )
+    print(f"[SYMPTOM MATRIX] {len(diseases)} diseases x {len(symptoms)} symptoms "
+          f"({int(matrix.sum())} links, {len(unknown)} unknown symptom names) written to {out_path}", flush=True)
+    return SymptomMatrix(out_path)
+
+
+class SymptomMatrix:
+    def __init__(self, path=DEFAULT_MATRIX_PATH):
+        with np.load(path) as data:
+            self.diseases = data["diseases"].tolist()
+            self.symptoms = data["symptoms"].tolist()
+            self.bengali = data["bengali"].tolist()
+            self.bits = data["bits"]
+        self.symptom_counts = POPCOUNT[self.bits].sum(axis=1, dtype=np.int32)
+
+    def encode(self, symptom_ids):
+        """Packed query row for a list of symptom IDs; raises ValueError on unknown IDs."""
+        row = np.zeros(len(self.symptoms), dtype=bool)
+        for symptom_id in symptom_ids:
+            if not 0 <= symptom_id < len(self.symptoms):
+                raise ValueError(f"Unknown symptom id {symptom_id}")
+            row[symptom_id] = True
+        return np.packbits(row)
+
+    def score(self, symptom_ids, n_results=5):
+        """
+        Top diseases by Jaccard similarity as [{disease: percentage}, ...],
+        leaving out diseases that share no symptom with the query.
+        """
+        query = self.encode(symptom_ids)
+        overlap = POPCOUNT[self.bits & query].sum(axis=1, dtype=np.int32)
+        union = self.symptom_counts + POPCOUNT[query].sum(dtype=np.int32) - overlap
+        jaccard = overlap / np.maximum(union, 1)
+        candidates = np.flatnonzero(overlap)
+        best = candidates[np.lexsort((candidates, -jaccard[candidates]))][:n_results]
+        return [{self.diseases[i]: float(jaccard[i] * 100)} for i in best]
+
+    def symptom_list(self):
+        return [
+            {"id": i, "symptom": name, "bengali": bengali or None}
+            for i, (name, bengali) in enumerate(zip(self.symptoms, self.bengali))
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the packed disease x symptom matrix")
+    parser.add_argument("--json", default=DEFAULT_JSON)
+    parser.add_argument("--symptoms", default=DEFAULT_SYMPTOMS_CSV)
+    parser.add_argument("--out", default=DEFAULT_MATRIX_PATH)
+    args = parser.parse_args()
+    matrix = build_symptom_matrix(args.json, args.symptoms, args.out)
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        matrix.score([0, 1, 2])
+    print(f"[SYMPTOM MATRIX] score() takes {(time.perf_counter() - start):.3f} ms per query", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Bengali (and mixed Bengali/English) symptom normalization ahead of disease_detection.
+
+all-MiniLM-L6-v2 only understands English, so queries containing Bengali
+script are rewritten into canonical English symptom phrases from
+dataset/symptoms.csv before retrieval, with no translation call:
+  1. a character trie compiled from the Bengali and English names matches
+     the longest known name starting at each word (inflectional suffixes
+     such as "কাশিতে" are absorbed into the match)
+  2. Bengali text left over between matches is split on separators and
+     conjunctions and matched to the nearest vocabulary name by cosine
+     over precomputed character-trigram vectors (works for Bengali script
+     without a multilingual model); matches below MIN_SIMILARITY are dropped
+English leftovers are kept as they are. Queries without Bengali script pass
+through unchanged.
+"""
+import re
+import unicodedata
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from symptom_matrix import load_symptoms, DEFAULT_SYMPTOMS_CSV
+
+NGRAM_DIM = 4096
+MIN_SIMILARITY = 0.5
+
+_BENGALI = re.compile(r"[ঀ-৿]")
+_SEPARATORS = re.compile(r"[,;।?!\n]+|\s(?:ও|এবং|আর|and|with)\s")
+_WHITESPACE = re.compile(r"\s+")
+# Bengali filler words ("my", "very", "is happening", "have", ...) dropped before the fallback
+FILLER_WORDS = {"আমার", "আমি", "খুব", "অনেক", "হচ্ছে", "হয়েছে", "আছে", "করছে", "লাগছে", "একটু", "সাথে", "এবং", "ও", "আর"}
+_TERMINAL = "$"
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", str(text)).lower()).strip()
+
+
+def has_bengali(text):
+    return bool(_BENGALI.search(text or ""))
+
+
+def ngram_vector(text):
+    """Hashed character-trigram vector (L2-normalized) of a phrase."""
+    padded = f" {text} "
+    vector = np.zeros(NGRAM_DIM, dtype=np.float32)
+    for i in range(len(padded) - 2):
+        vector[zlib.crc32(padded[i:i + 3].encode("utf-8")) % NGRAM_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SymptomNormalizer:
+    def __init__(self, symptoms_csv=DEFAULT_SYMPTOMS_CSV):
+        self.trie = {}
+        names, canonical = [], []
+        for english, bengali in load_symptoms(symptoms_csv):
+            for name in (english, bengali):
+                name = normalize_text(name)
+                if not name:
+                    continue
+                node = self.trie
+                for char in name:
+                    node = node.setdefault(char, {})
+                node[_TERMINAL] = english
+                names.append(name)
+                canonical.append(english)
+        self.canonical = canonical
+        # Precomputed fallback vectors, one per Bengali or English name
+        self.vectors = np.stack([ngram_vector(name) for name in names])
+        self.stats = Counter()
+
+    def _longest_match(self, text, start):
+        """(end, canonical) of the longest trie name starting at text[start], or None."""
+        node, match = self.trie, None
+        for i in range(start, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if _TERMINAL in node:
+                match = (i + 1, node[_TERMINAL])
+        return match
+
+    def nearest(self, phrase):
+        """Closest canonical symptom by trigram cosine, or None below MIN_SIMILARITY."""
+        scores = self.vectors @ ngram_vector(phrase)
+        best = int(np.argmax(scores))
+        return self.canonical[best] if scores[best] >= MIN_SIMILARITY else None
+
+    def _fallback(self, gap, phrases, unmatched):
+        for chunk in _SEPARATORS.split(f" {gap} "):
+            words = [word for word in chunk.split() if word not in FILLER_WORDS]
+            chunk = " ".join(words).strip(" .")
+            if not chunk:
+                continue
+            if not has_bengali(chunk):
+                phrases.append(chunk)
+                continue
+            match = self.nearest(chunk)
+            if match:
+                self.stats["nearest"] += 1
+                phrases.append(match)
+            else:
+                self.stats["unmatched"] += 1
+                unmatched.append(chunk)
+
+    def normalize(self, query):
+        """Returns (canonical English query, unmatched Bengali fragments)."""
+        if not has_bengali(query):
+            return query, []
+        self.stats["queries"] += 1
+        text = normalize_text(query)
+        phrases, unmatched = [], []
+        gap_start = i = 0
+        while i < len(text):
+            # Names only match from the start of a word
+            match = self._longest_match(text, i) if i == 0 or text[i - 1].isspace() or text[i - 1] in ",;।?!" else None
+            if match is None:
+                i += 1
+                continue
+            end, english = match
+            # Absorb the rest of the word (Bengali case endings, English plurals)
+            while end < len(text) and not text[end].isspace() and not _SEPARATORS.match(text[end]):
+                end += 1
+            self._fallback(text[gap_start:i], phrases, unmatched)
+            self.stats["trie"] += 1
+            phrases.append(english)
+            gap_start = i = end
+        self._fallback(text[gap_start:], phrases, unmatched)
+        return ", ".join(dict.fromkeys(phrases)), unmatched
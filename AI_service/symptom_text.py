@@ -0,0 +1,21 @@
+"""
+Helpers for normalizing free-text symptom lists such as
+"Fever ,  cough,fever" -> "cough, fever"
+"""
+import re
+
+_SEPARATORS = re.compile(r"[,;\n]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def split_symptoms(text):
+    """Split a symptom list into lower-cased, whitespace-collapsed phrases (order and duplicates kept)."""
+    if not text:
+        return []
+    phrases = (_WHITESPACE.sub(" ", part).strip() for part in _SEPARATORS.split(str(text).lower()))
+    return [phrase for phrase in phrases if phrase]
+
+
+def normalize_query(text):
+    """Order-insensitive canonical form of a symptom list: unique phrases, sorted, joined by ', '."""
+    return ", ".join(sorted(set(split_symptoms(text))))
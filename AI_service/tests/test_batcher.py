@@ -0,0 +1,26 @@
+import asyncio
+
+import pytest
+
+from batcher import MicroBatcher
+
+
+def run_batch(process_batch, items):
+    async def main():
+        batcher = MicroBatcher(process_batch, window_ms=1)
+        await batcher.start()
+        try:
+            return await asyncio.wait_for(asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True), 2)
+        finally:
+            await batcher.stop()
+    return asyncio.run(main())
+
+
+def test_results_go_back_to_their_callers():
+    assert run_batch(lambda items: [item * 2 for item in items], [1, 2, 3]) == [2, 4, 6]
+
+
+@pytest.mark.parametrize("results", [[], [0]])
+def test_short_result_list_fails_every_caller(results):
+    outcomes = run_batch(lambda items: results, [1, 2, 3])
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
@@ -0,0 +1,20 @@
+import pytest
+
+from department_mapping import lookup_department, match_department
+
+
+@pytest.mark.parametrize("disease, department", [
+    # The condition decides the department, not its cause (the hypertension synonym used to win)
+    ("retinopathy due to high blood pressure", "Ophthalmology"),
+    ("conjunctivitis due to allergy", "Ophthalmology"),
+    ("heart failure due to high blood pressure", "Cardiology"),
+    ("diabetic retinopathy", "Ophthalmology"),
+    ("chronic migraine", "Neurology"),
+])
+def test_partial_match_prefers_the_condition(disease, department):
+    assert match_department(disease) == department
+
+
+def test_lookup_only_takes_exact_names_and_synonyms():
+    assert lookup_department("High  Blood Pressure") == "Cardiology"
+    assert lookup_department("retinopathy due to high blood pressure") is None
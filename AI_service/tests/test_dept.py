@@ -0,0 +1,68 @@
+import asyncio
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+import dept
+
+
+class DiagnoseResponse(BaseModel):
+    """Same shape as backend-fastapi/app/routers/diagnosis.py DiagnoseResponse."""
+    symptoms: str
+    possible_diseases: List[str]
+    recommended_departments: List[str]
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Make every LLM call answer with `answer` (or raise it when it is an exception)."""
+    monkeypatch.setattr(dept, "OLLAMA_HOST", "http://localhost:11434")
+    monkeypatch.setattr(dept, "OLLAMA_API_KEY", "")
+
+    def install(answer):
+        async def reply(client, *args, **kwargs):
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        async def classify(client, diseases):
+            if isinstance(answer, Exception):
+                raise answer
+            return dept.parse_batch_answer(diseases, '{"%s": "%s"}' % (diseases[0], answer))
+
+        monkeypatch.setattr(dept, "dept_generate_async", reply)
+        monkeypatch.setattr(dept, "dept_finalize_async", reply)
+        monkeypatch.setattr(dept, "dept_classify_batch_async", classify)
+    return install
+
+
+def diagnose(diseases, mode):
+    departments = asyncio.run(dept.resolve_departments(diseases, mode=mode))
+    return DiagnoseResponse(symptoms="x", possible_diseases=diseases, recommended_departments=departments)
+
+
+@pytest.mark.parametrize("mode", ["batch", "vote"])
+@pytest.mark.parametrize("answer", ["", "Astrology", RuntimeError("LLM unavailable")])
+def test_every_disease_gets_a_department_name(fake_llm, mode, answer):
+    fake_llm(answer)
+    response = diagnose(["qwxyzzy", "chronic migraine", "asthma"], mode)
+    assert all(response.recommended_departments)
+    assert response.recommended_departments[2] == "Respiratory Medicine"
+
+
+@pytest.mark.parametrize("mode", ["batch", "vote"])
+@pytest.mark.parametrize("answer", ["", RuntimeError("LLM unavailable")])
+def test_no_llm_answer_falls_back_to_partial_match_then_general_practice(fake_llm, mode, answer):
+    fake_llm(answer)
+    response = diagnose(["qwxyzzy", "chronic migraine"], mode)
+    assert response.recommended_departments == ["General Practice", "Neurology"]
+
+
+def test_iter_departments_yields_a_department_for_every_disease(fake_llm):
+    fake_llm("")
+
+    async def collect():
+        return dict([item async for item in dept.iter_departments(["qwxyzzy", "asthma"], mode="vote")])
+
+    assert asyncio.run(collect()) == {0: "General Practice", 1: "Respiratory Medicine"}
@@ -0,0 +1,146 @@
+"""
+Memory-mapped NumPy exact-search vector store.
+
+An alternative to ChromaDB behind disease_detection (VECTOR_BACKEND=numpy).
+Embeddings are stored L2-normalized as float16 in embeddings.npy and opened
+with mmap, so startup is zero-copy and the pages are shared between uvicorn
+workers. Metadata (id, disease, symptoms) is kept in a parallel JSON array.
+
+Search is exact: a matrix-vector product over the rows followed by
+argpartition, scanned in fixed-size chunks so memory stays bounded.
+query() returns the same shape as Chroma's collection.query, with
+Chroma's default squared-L2 distance (2 - 2 * cosine for unit vectors),
+so percentages and ordering match an exact Chroma search.
+"""
+import json
+import os
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+
+# Rows converted to float32 and scored per step of the scan
+SCAN_CHUNK_ROWS = 65536
+EXPORT_PAGE_SIZE = 5000
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores per row, best first; ties go to the lower index."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.int64)
+    # Keep everything tied with the k-th best score so the tie-break sees all of them
+    kth = np.partition(scores, scores.shape[1] - k, axis=1)[:, scores.shape[1] - k]
+    result = np.empty((scores.shape[0], k), dtype=np.int64)
+    for i, row in enumerate(scores):
+        candidates = np.flatnonzero(row >= kth[i])
+        order = np.lexsort((candidates, -row[candidates]))
+        result[i] = candidates[order[:k]]
+    return result
+
+
+def top_k_merge(scores, rows, k):
+    """Positions of the k best (score desc, row asc) entries in each row of a merged candidate list."""
+    order = np.lexsort((rows, -scores), axis=1)
+    return order[:, :k]
+
+
+def query_result(store, rows, scores):
+    """
+    Chroma collection.query()-shaped dict for search() results over store
+    (anything with ids, diseases and symptoms lists indexed by row).
+    """
+    return {
+        "ids": [[store.ids[r] for r in row] for row in rows],
+        "distances": [[float(2.0 - 2.0 * s) for s in score] for score in scores],
+        "metadatas": [[{"disease": store.diseases[r], "symptoms": store.symptoms[r]} for r in row] for row in rows],
+        "documents": [[store.symptoms[r] for r in row] for row in rows],
+    }
+
+
+class NumpyVectorStore:
+    def __init__(self, path):
+        self.path = path
+        self.embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(path, METADATA_FILE), encoding="utf-8") as f:
+            metadata = json.load(f)
+        self.ids = metadata["ids"]
+        self.diseases = metadata["diseases"]
+        self.symptoms = metadata["symptoms"]
+
+    @staticmethod
+    def exists(path):
+        return os.path.isfile(os.path.join(path, EMBEDDINGS_FILE)) and os.path.isfile(os.path.join(path, METADATA_FILE))
+
+    @classmethod
+    def write(cls, path, ids, embeddings, metadatas):
+        """
+        Write a store from row ids, embeddings and Chroma-style metadatas ({disease, symptoms}).
+        Files are written next to the old ones and swapped in with os.replace, so
+        workers that still have the old embeddings mmapped keep reading intact data.
+        """
+        os.makedirs(path, exist_ok=True)
+        vectors = normalize_rows(embeddings).astype(np.float16) if len(ids) else np.zeros((0, 0), dtype=np.float16)
+        with open(os.path.join(path, EMBEDDINGS_FILE + ".tmp"), "wb") as f:
+            np.save(f, vectors)
+        with open(os.path.join(path, METADATA_FILE + ".tmp"), "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": [str(row_id) for row_id in ids],
+                "diseases": [m["disease"] for m in metadatas],
+                "symptoms": [m.get("symptoms", "") for m in metadatas],
+            }, f, separators=(",", ":"))
+        for name in (EMBEDDINGS_FILE, METADATA_FILE):
+            os.replace(os.path.join(path, name + ".tmp"), os.path.join(path, name))
+        return cls(path)
+
+    @classmethod
+    def from_collection(cls, collection, path):
+        """Export every row of a Chroma collection into a store at path."""
+        ids, embeddings, metadatas = [], [], []
+        offset = 0
+        while True:
+            page = collection.get(include=["embeddings", "metadatas"], limit=EXPORT_PAGE_SIZE, offset=offset)
+            ids.extend(page['ids'])
+            embeddings.extend(page['embeddings'])
+            metadatas.extend(page['metadatas'])
+            if len(page['ids']) < EXPORT_PAGE_SIZE:
+                break
+            offset += EXPORT_PAGE_SIZE
+        # Stable row order independent of Chroma's internal storage order
+        order = sorted(range(len(ids)), key=lambda i: ids[i])
+        return cls.write(path, [ids[i] for i in order], [embeddings[i] for i in order], [metadatas[i] for i in order])
+
+    def count(self):
+        return len(self.ids)
+
+    def search(self, query_embeddings, n_results=5):
+        """Exact top-k: returns (row indices, cosine scores), both shaped (queries, k)."""
+        queries = normalize_rows(query_embeddings)
+        k = min(n_results, self.count())
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        for start in range(0, self.count(), SCAN_CHUNK_ROWS):
+            chunk = np.asarray(self.embeddings[start:start + SCAN_CHUNK_ROWS], dtype=np.float32)
+            scores = queries @ chunk.T
+            rows = top_k(scores, k)
+            # Merge this chunk's top-k with the running top-k
+            merged_rows = np.concatenate([best_rows, rows + start], axis=1)
+            merged_scores = np.concatenate([best_scores, np.take_along_axis(scores, rows, axis=1)], axis=1)
+            keep = top_k_merge(merged_scores, merged_rows, k)
+            best_rows = np.take_along_axis(merged_rows, keep, axis=1)
+            best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        return best_rows, best_scores
+
+    def query(self, query_embeddings, n_results=5, **kwargs):
+        """Chroma-compatible query() (ids, distances, metadatas, documents per query)."""
+        rows, scores = self.search(query_embeddings, n_results)
+        return query_result(self, rows, scores)
@@ -2,11 +2,13 @@
 AI Diagnosis Router - Integrates with AI Service
 """
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
 from pydantic import BaseModel
 from typing import List
 import httpx
+import json
 import os
 
 router = APIRouter(prefix="/diagnosis", tags=["diagnosis"])
@@ -27,37 +29,26 @@ async def diagnose_symptoms(request: DiagnoseRequest):
     """
     AI-powered symptom diagnosis
 
-    Calls the AI service to detect diseases and recommend departments
+    Calls the AI service's /diagnose endpoint to detect diseases and recommend departments
     """
     try:
         async with httpx.AsyncClient(timeout=120.0) as client:
-            # Step 1: Detect diseases from symptoms
-            disease_response = await client.post(
-                f"{AI_SERVICE_URL}/detect_disease",
+            # Disease detection and department recommendation in one request
+            diagnose_response = await client.post(
+                f"{AI_SERVICE_URL}/diagnose",
                 params={"query": request.symptoms}
             )
 
-            if disease_response.status_code != 200:
+            if diagnose_response.status_code != 200:
                 raise HTTPException(
                     status_code=500,
-                    detail=f"Disease detection failed: {disease_response.text}"
+                    detail=f"Diagnosis failed: {diagnose_response.text}"
                 )
 
-            diseases = disease_response.json()["diseases"]
-
-            # Step 2: Get department recommendations
-            dept_response = await client.post(
-                f"{AI_SERVICE_URL}/detect_dept",
-                json=diseases
-            )
-
-            if dept_response.status_code != 200:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Department detection failed: {dept_response.text}"
-                )
-
-            departments = dept_response.json()["departments"]
+            result = diagnose_response.json()
+            # The AI service returns [{disease: percentage}, ...]
+            diseases = [list(disease.keys())[0] for disease in result["diseases"]]
+            departments = result["departments"]
 
             return DiagnoseResponse(
                 symptoms=request.symptoms,
@@ -81,6 +72,39 @@ async def diagnose_symptoms(request: DiagnoseRequest):
             detail=f"Diagnosis failed: {str(e)}"
         )
 
+@router.post("/symptom-check/stream")
+async def diagnose_symptoms_stream(request: DiagnoseRequest):
+    """
+    Streaming AI symptom diagnosis
+
+    Relays the AI service's Server-Sent Events as they arrive: `diseases`
+    first, then one `department` event per disease and a final `done`
+    """
+    async def relay():
+        try:
+            async with httpx.AsyncClient(timeout=httpx.Timeout(120.0, connect=10.0)) as client:
+                async with client.stream(
+                    "POST",
+                    f"{AI_SERVICE_URL}/diagnose/stream",
+                    params={"query": request.symptoms}
+                ) as response:
+                    if response.status_code != 200:
+                        detail = (await response.aread()).decode(errors="replace")
+                        yield f"event: error\ndata: {json.dumps({'detail': f'Diagnosis failed: {detail}'})}\n\n"
+                        return
+                    async for chunk in response.aiter_raw():
+                        yield chunk
+        except httpx.TimeoutException:
+            yield f"event: error\ndata: {json.dumps({'detail': 'AI service timeout - please try again'})}\n\n"
+        except httpx.RequestError as e:
+            yield f"event: error\ndata: {json.dumps({'detail': f'AI service unavailable: {str(e)}'})}\n\n"
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/ai-health")
 async def check_ai_service():
     """